@@ -1,8 +1,16 @@
 import sys, yaml, multiprocessing
 from yaml.loader import SafeLoader
-import src.EngineMatch
-from src.Engine import Engine
-from src.TimeControl import TimeControl
+from src.GameClient import requestGame
+
+# Play the game in this process if no game daemon is running
+def playGameLocally(engines: list, timeControlString: str, gameNr: int) -> int:
+    # Only imported when needed, so handing games to the daemon stays fast
+    from src.EngineMatch import singleGame
+    from src.Engine import Engine
+    from src.TimeControl import TimeControl
+
+    record = singleGame([Engine(name, params) for name, params in engines], TimeControl(timeControlString), gameNr)
+    return record.winnerEngine()
 
 def main():
     # Check if there are sufficient arguments
@@ -32,38 +40,31 @@ def main():
             opponentName = data["opponent_name"]
             opponentParams = data["opponent_parameters"]
             timeControlString = data["time_control"]
+            socketPath = data.get("daemon_socket")
     except:
         sys.stderr.write(f"Insufficient/invalid options in CLOP_QuintTest_options.yaml\n")
         return 2
 
-    # Create engine objects, determine who's white from the seed
-    engine1 = Engine(engineName, engineParams)
-    engine2 = Engine(opponentName, opponentParams)
-    if seed % 2 == 1:
-        engine1, engine2 = engine2, engine1
+    # Engine plays against opponent, who's white is determined by the seed (the first engine is white in even games)
+    engines = [[engineName, engineParams], [opponentName, opponentParams]]
+    gameNr = seed % 2
 
-    # Create time control object
-    timeControl = TimeControl(timeControlString)
-
-    # Complete engine match
+    # Complete engine game on a running game daemon with warm engines, or in this process
     try:
-        results = src.EngineMatch.engineMatch([engine1, engine2], 1, timeControl, 1, True)
+        reply = requestGame(engines, timeControlString, gameNr, socketPath)
+        winnerEngine = reply["winnerEngine"] if reply != None else playGameLocally(engines, timeControlString, gameNr)
     except:
         sys.stderr.write("Engine match failed\n")
         return 1
 
     # Check which engine won
-    if results.getEngine1Wins() == 1:
+    if winnerEngine == 0:
         result = 1
-    elif results.getEngine2Wins() == 1:
+    elif winnerEngine == 1:
         result = 0
     else:
         result = 0.5
 
-    # Adjust results for white/black
-    if seed % 2 == 1:
-        result = 1 - result
-
     # Print out results
     if result == 1:
         sys.stdout.write('W\n')
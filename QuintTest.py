@@ -1,27 +1,125 @@
+import sys
 import argparse
 import multiprocessing
 import src.Test
+import src.GameDaemon
+import src.Tune
+import src.Bench
+import src.MockEngine
+import src.Distributed
+import src.Report
+from src.TimeControl import MOVE_GRACE
+
+# Add options of the matches that the test and serve commands play
+def addMatchArguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("testEngines", nargs="+", type=str)
+    parser.add_argument("baseEngine", type=str)
+    parser.add_argument("-g", "--games", type=int, required=True, dest="games", help="Number of games per match")
+    parser.add_argument("-t", "--time", type=str, required=True, dest="timeControl", help="Time control for match, like 5+0.1, =0.1, nodes=50000 or depth=10, limits can be combined with commas and odds=F gives engine 1 F times the time")
+    parser.add_argument("-o", "--output", default=None, type=str,  dest="outputName", help="Output name for test results")
+    parser.add_argument("--sprt", default=None, type=str, dest="sprt", help="SPRT parameters elo0,elo1,alpha,beta, stops a match early")
+    parser.add_argument("--openings", default=None, type=str, dest="openings", help="EPD or PGN file with start positions, each played with both colors")
+    parser.add_argument("--resign", default=None, type=str, dest="resign", help="Resign adjudication MOVES,SCORE: both engines agree on a score beyond SCORE centipawns for MOVES moves")
+    parser.add_argument("--draw", default=None, type=str, dest="draw", help="Draw adjudication NUMBER,MOVES,SCORE: from move NUMBER both engines report at most SCORE centipawns for MOVES moves")
+    parser.add_argument("--pgn", default=None, type=str, dest="pgn", help="PGN file that all games are written to (.gz or .zst for compression)")
+    parser.add_argument("--archive", default=None, type=str, dest="archive", help="Compact binary archive that all games are appended to")
+    parser.add_argument("--pgn-comments", action="store_true", dest="pgnComments", help="Add score, depth and time of every move to the PGN file")
+    parser.add_argument("--resume", action="store_true", dest="resume", help="Continue the latest interrupted run of every match")
+    parser.add_argument("--top-up", action="store_true", dest="topUp", help="Reuse cached games of the same engine binaries, options, time control, adjudication and openings, only playing the missing games")
+    parser.add_argument("--round-robin", action="store_true", dest="roundRobin", help="Play every engine against every other engine instead of only the base engine")
+    parser.add_argument("--timing-log", default=None, type=str, dest="timingLog", help="JSON lines file that move and game timings are exported to")
+    parser.add_argument("--threads", default=None, type=int, dest="threads", help="Threads UCI option of all engines, games get as many cores")
+    parser.add_argument("--hash", default=None, type=int, dest="hash", help="Hash UCI option of all engines in MB")
+    parser.add_argument("--metrics-port", default=None, type=int, dest="metricsPort", help="Serve live metrics of the matches on this local port (Prometheus at /metrics, JSON at /metrics.json, 0 for any free port)")
+    parser.add_argument("--move-grace", default=MOVE_GRACE, type=float, dest="moveGrace", help="Seconds an engine gets beyond its time for a move before its process group is killed")
+    parser.add_argument("--retries", default=0, type=int, dest="retries", help="Number of times a game is replayed with restarted engines after an engine crashed or timed out")
 
 if __name__ == "__main__":
     # Is needed for some reason
     multiprocessing.freeze_support()
 
+    # Run the fake engine of the bench command, built executables start it through this hidden command
+    if sys.argv[1:2] == ["mock-engine"]:
+        src.MockEngine.main(sys.argv[2:])
+        sys.exit()
+
     # Create parser for command line arguments
     arger = argparse.ArgumentParser()
     subparsers = arger.add_subparsers(dest="command")
     
     # Create parser for test command
     testParser = subparsers.add_parser("test")
-    testParser.add_argument("testEngines", nargs="+", type=str)
-    testParser.add_argument("baseEngine", type=str)
-    testParser.add_argument("-g", "--games", type=int, required=True, dest="games", help="Number of games per match")
-    testParser.add_argument("-t", "--time", type=str, required=True, dest="timeControl", help="Time control for match")
+    addMatchArguments(testParser)
     testParser.add_argument("-c", "--concurrency", default=1, type=int,  dest="concurrency", help="Number of games simultaneously")
-    testParser.add_argument("-o", "--output", default=None, type=str,  dest="outputName", help="Output name for test results")
+    testParser.add_argument("--backend", default="process", choices=["process", "asyncio"], dest="backend", help="Run every game in its own process or all games on one event loop")
+    testParser.add_argument("--affinity", action="store_true", dest="affinity", help="Pin the engines of every game to dedicated cores, refuses to oversubscribe them (Linux only)")
+    testParser.add_argument("--tb", default=None, type=str, dest="tablebases", help="Directory of Syzygy tablebases for adjudication")
+
+    # Create parser for serve command, which takes the match options of the test command and hands out the games to workers
+    # Concurrency, backend, affinity and tablebases are set on every worker
+    serveParser = subparsers.add_parser("serve")
+    addMatchArguments(serveParser)
+    serveParser.add_argument("--host", default="127.0.0.1", type=str, dest="host", help="Address to listen on for workers, 0.0.0.0 for all interfaces")
+    serveParser.add_argument("--port", default=4714, type=int, dest="port", help="TCP port to listen on for workers")
+    serveParser.add_argument("--batch-size", default=None, type=int, dest="batchSize", help="Number of games handed to a worker at once (default: its concurrency)")
+
+    # Create parser for worker command, which plays games for a serve command with local engines
+    workerParser = subparsers.add_parser("worker")
+    workerParser.add_argument("host", type=str, help="Address of the coordinator")
+    workerParser.add_argument("--port", default=4714, type=int, dest="port", help="TCP port of the coordinator")
+    workerParser.add_argument("-c", "--concurrency", default=1, type=int, dest="concurrency", help="Number of games simultaneously")
+    workerParser.add_argument("--tb", default=None, type=str, dest="tablebases", help="Directory of Syzygy tablebases for adjudication on this machine")
+
+    # Create parser for report command, which summarizes the matches in the result store
+    reportParser = subparsers.add_parser("report")
+    reportParser.add_argument("--match", default=None, type=str, dest="matchFilter", help="Only show matches whose engines, time control or openings contain this string")
+    reportParser.add_argument("-o", "--output", default=None, type=str, dest="outputName", help="Output name for the report")
+
+    # Create parser for archive command, which summarizes a game archive
+    archiveParser = subparsers.add_parser("archive")
+    archiveParser.add_argument("path", type=str, help="Archive written with --archive")
+    archiveParser.add_argument("--time-losses", default=None, type=str, dest="timeLossEngine", help="List the games that this engine lost on time")
+    archiveParser.add_argument("-o", "--output", default=None, type=str, dest="outputName", help="Output name for the summary")
+
+    # Create parser for tune command
+    tuneParser = subparsers.add_parser("tune")
+    tuneParser.add_argument("config", type=str, help="YAML file with the engine, time control, iterations and parameters to tune")
+    tuneParser.add_argument("-c", "--concurrency", default=1, type=int, dest="concurrency", help="Number of game pairs simultaneously")
+    tuneParser.add_argument("-o", "--output", default=None, type=str, dest="outputName", help="Output name for tuned values")
+    tuneParser.add_argument("--checkpoint", default=None, type=str, dest="checkpoint", help="JSON file that progress is saved to and continued from (default: CONFIG.checkpoint.json)")
+
+    # Create parser for bench command, which measures QuintTest with a fake engine
+    benchParser = subparsers.add_parser("bench")
+    benchParser.add_argument("-g", "--games", default=100, type=int, dest="games", help="Number of games per measurement")
+    benchParser.add_argument("-t", "--time", default=["=0.001"], nargs="+", type=str, dest="timeControls", help="Time controls to measure")
+    benchParser.add_argument("-c", "--concurrency", default=[1], nargs="+", type=int, dest="concurrencies", help="Numbers of simultaneous games to measure")
+    benchParser.add_argument("-o", "--output", default=None, type=str, dest="outputName", help="Output name for benchmark results")
+    benchParser.add_argument("--backend", default="process", choices=["process", "asyncio"], dest="backend", help="Run every game in its own process or all games on one event loop")
+    benchParser.add_argument("--latency", default=0.0, type=float, dest="latency", help="Seconds the fake engine waits before every move")
+    benchParser.add_argument("--crash", default=0.0, type=float, dest="crash", help="Probability of the fake engine crashing on a move")
+    benchParser.add_argument("--hang", default=0.0, type=float, dest="hang", help="Probability of the fake engine never answering a move")
+
+    # Create parser for daemon command, which plays single games for CLOP_QuintTest on warm engines
+    daemonParser = subparsers.add_parser("daemon")
+    daemonParser.add_argument("--socket", default=None, type=str, dest="socket", help="Unix socket to listen on (default: share/QuintTest.sock)")
     
     # Parse command line arguments
     options = arger.parse_args()
 
     # Execute command
     if options.command == "test":
-        src.Test.test(options.testEngines, options.baseEngine, options.games, options.timeControl, options.concurrency, options.outputName)
\ No newline at end of file
+        src.Test.test(options.testEngines, options.baseEngine, options.games, options.timeControl, processes=options.concurrency, outputName=options.outputName, sprt=options.sprt, openings=options.openings, backend=options.backend, resign=options.resign, draw=options.draw, tablebases=options.tablebases, pgn=options.pgn, pgnComments=options.pgnComments, resume=options.resume, roundRobin=options.roundRobin, timingLog=options.timingLog, threads=options.threads, hash=options.hash, affinity=options.affinity, archive=options.archive, topUp=options.topUp, metricsPort=options.metricsPort, moveGrace=options.moveGrace, retries=options.retries)
+    elif options.command == "serve":
+        src.Test.test(options.testEngines, options.baseEngine, options.games, options.timeControl, outputName=options.outputName, sprt=options.sprt, openings=options.openings, resign=options.resign, draw=options.draw, pgn=options.pgn, pgnComments=options.pgnComments, resume=options.resume, roundRobin=options.roundRobin, timingLog=options.timingLog, threads=options.threads, hash=options.hash, serveAddress=(options.host, options.port), batchSize=options.batchSize, archive=options.archive, topUp=options.topUp, metricsPort=options.metricsPort, moveGrace=options.moveGrace, retries=options.retries)
+    elif options.command == "worker":
+        src.Distributed.runWorker(options.host, options.port, options.concurrency, options.tablebases)
+    elif options.command == "report":
+        src.Report.report(options.matchFilter, options.outputName)
+    elif options.command == "archive":
+        src.Report.archiveReport(options.path, options.timeLossEngine, options.outputName)
+    elif options.command == "tune":
+        src.Tune.tune(options.config, options.concurrency, options.checkpoint, options.outputName)
+    elif options.command == "bench":
+        src.Bench.bench(options.concurrencies, options.timeControls, options.games, options.backend, options.latency, options.crash, options.hang, options.outputName)
+    elif options.command == "daemon":
+        src.GameDaemon.serveGames(options.socket)
\ No newline at end of file
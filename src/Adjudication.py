@@ -0,0 +1,122 @@
+import chess, chess.engine, chess.syzygy
+
+# Tablebases opened in the current process by directory, so they're only opened once
+openTablebases = {}
+
+# Class for settings of game adjudication, ending games early whose result is clear
+class Adjudication:
+    resignMoves: int # Number of consecutive moves that both engines have to agree on a score
+    resignScore: int # Score in centipawns that the losing engine has to stay below (negated)
+    drawMoveNumber: int # Move number from which draws are adjudicated
+    drawMoves: int # Number of consecutive moves that both engines have to report a drawish score
+    drawScore: int # Absolute score in centipawns that both engines have to stay at or below
+    tablebasePath: str # Directory of Syzygy tablebases
+
+    # Extract adjudication settings from strings: resign "3,1000" -> 3 moves below -1000cp, draw "40,8,10" -> from move 40, 8 moves within 10cp
+    def __init__(self, resignString: str = None, drawString: str = None, tablebasePath: str = None):
+        self.resignMoves = self.resignScore = None
+        self.drawMoveNumber = self.drawMoves = self.drawScore = None
+        self.tablebasePath = tablebasePath
+
+        if resignString:
+            self.resignMoves, self.resignScore = [int(param) for param in resignString.split(",")]
+        if drawString:
+            self.drawMoveNumber, self.drawMoves, self.drawScore = [int(param) for param in drawString.split(",")]
+
+    # Convert score settings to dictionary for sending over the network, tablebases are local to every machine
+    def toDict(self) -> dict:
+        return {"resignMoves": self.resignMoves, "resignScore": self.resignScore, "drawMoveNumber": self.drawMoveNumber, "drawMoves": self.drawMoves, "drawScore": self.drawScore}
+
+    # Create settings from a dictionary, with the local tablebases
+    @classmethod
+    def fromDict(cls, data: dict, tablebasePath: str = None):
+        adjudication = cls(tablebasePath=tablebasePath)
+        adjudication.resignMoves, adjudication.resignScore = data["resignMoves"], data["resignScore"]
+        adjudication.drawMoveNumber, adjudication.drawMoves, adjudication.drawScore = data["drawMoveNumber"], data["drawMoves"], data["drawScore"]
+        return adjudication
+
+    # Check if any adjudication is done
+    def isEnabled(self) -> bool:
+        return self.resignMoves != None or self.drawMoves != None or self.tablebasePath != None
+
+    # Convert settings to string
+    def toString(self) -> str:
+        parts = []
+        if self.resignMoves != None:
+            parts.append(f"resign after {self.resignMoves} moves below -{self.resignScore}cp")
+        if self.drawMoves != None:
+            parts.append(f"draw from move {self.drawMoveNumber} after {self.drawMoves} moves within {self.drawScore}cp")
+        if self.tablebasePath != None:
+            parts.append(f"tablebases at {self.tablebasePath}")
+        return ", ".join(parts)
+
+    # Get Syzygy tablebase of the settings, opening it on first use in this process
+    def tablebase(self) -> chess.syzygy.Tablebase:
+        if self.tablebasePath not in openTablebases:
+            openTablebases[self.tablebasePath] = chess.syzygy.open_tablebase(self.tablebasePath)
+        return openTablebases[self.tablebasePath]
+
+# Class for adjudicating a single game based on the scores reported by the engines
+class Adjudicator:
+    adjudication: Adjudication
+    resignCounts: dict # Consecutive moves in which the engine of a color reported a losing score
+    winCounts: dict # Consecutive moves in which the engine of a color reported a winning score
+    drawCount: int # Consecutive moves in which both engines reported a drawish score
+    maxTablebasePieces: int
+    reason: str # Reason of the adjudication ("resign", "draw" or "tablebase"), None if the game wasn't adjudicated
+
+    def __init__(self, adjudication: Adjudication):
+        self.adjudication = adjudication
+        self.resignCounts = {chess.WHITE: 0, chess.BLACK: 0}
+        self.winCounts = {chess.WHITE: 0, chess.BLACK: 0}
+        self.drawCount = 0
+        self.reason = None
+
+        # Number of pieces of the largest tablebase, "KQvK" has 3 pieces
+        if adjudication.tablebasePath != None:
+            self.maxTablebasePieces = max([len(key) - 1 for key in adjudication.tablebase().wdl], default=0)
+        else:
+            self.maxTablebasePieces = 0
+
+    # Update counts after a move was played, return outcome if the game can be adjudicated
+    def update(self, board: chess.Board, score: chess.engine.PovScore) -> chess.Outcome:
+        moveTurn = not board.turn
+
+        # Probe tablebases once the position is small enough, results are from the side to move's view
+        if chess.popcount(board.occupied) <= self.maxTablebasePieces and not board.castling_rights:
+            wdl = self.adjudication.tablebase().get_wdl(board)
+            if wdl != None:
+                self.reason = "tablebase"
+                if wdl == 2:
+                    return chess.Outcome(chess.Termination.VARIANT_WIN, board.turn)
+                elif wdl == -2:
+                    return chess.Outcome(chess.Termination.VARIANT_WIN, not board.turn)
+                else:
+                    return chess.Outcome(chess.Termination.VARIANT_DRAW, None)
+
+        # Reset counts of engines that don't report a score
+        if score == None:
+            self.resignCounts[moveTurn] = self.winCounts[moveTurn] = self.drawCount = 0
+            return None
+        centipawns = score.pov(moveTurn).score(mate_score=100000)
+
+        if self.adjudication.resignMoves != None:
+            # Count moves in which the engine reported a clearly losing or winning score
+            self.resignCounts[moveTurn] = self.resignCounts[moveTurn] + 1 if centipawns <= -self.adjudication.resignScore else 0
+            self.winCounts[moveTurn] = self.winCounts[moveTurn] + 1 if centipawns >= self.adjudication.resignScore else 0
+
+            # Engine resigns if both engines agree it's lost
+            for loser in [moveTurn, not moveTurn]:
+                if self.resignCounts[loser] >= self.adjudication.resignMoves and self.winCounts[not loser] >= self.adjudication.resignMoves:
+                    self.reason = "resign"
+                    return chess.Outcome(chess.Termination.VARIANT_WIN, not loser)
+
+        if self.adjudication.drawMoves != None:
+            # Count moves of both engines with drawish scores
+            self.drawCount = self.drawCount + 1 if abs(centipawns) <= self.adjudication.drawScore else 0
+
+            if board.fullmove_number >= self.adjudication.drawMoveNumber and self.drawCount >= 2 * self.adjudication.drawMoves:
+                self.reason = "draw"
+                return chess.Outcome(chess.Termination.VARIANT_DRAW, None)
+
+        return None
@@ -0,0 +1,61 @@
+import os
+
+# Get the cores the current process is allowed to run on
+def availableCores() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+# Check if processes can be pinned to cores on this platform (only Linux)
+def canPinProcesses() -> bool:
+    return hasattr(os, "sched_setaffinity") and os.path.isdir("/proc/self/task")
+
+# Pin all threads of a process to cores, threads that are created later inherit the cores
+def pinProcess(pid: int, cores: list) -> None:
+    try:
+        threadIds = [int(threadId) for threadId in os.listdir(f"/proc/{pid}/task")]
+    except FileNotFoundError:
+        # Process has already exited
+        return
+
+    for threadId in threadIds:
+        try:
+            os.sched_setaffinity(threadId, cores)
+        except ProcessLookupError:
+            # Thread has exited in the meantime
+            pass
+
+# Class for giving every game slot of a match its own cores, enough for the engine with the most threads
+# Engines of a game only think one at a time, so they can share the cores of the game
+class CoreScheduler:
+    concurrency: int # Number of games played simultaneously
+    threadsPerGame: int # Number of cores needed by a game
+    cores: list # Cores available to the games
+
+    # Create scheduler for a number of simultaneous games on the available cores
+    def __init__(self, concurrency: int, threadsPerGame: int):
+        self.concurrency = concurrency
+        self.threadsPerGame = threadsPerGame
+        self.cores = availableCores()
+
+    # Create scheduler for the engines of all matches
+    @classmethod
+    def forPairings(cls, pairings: list, concurrency: int):
+        return cls(concurrency, max(engine.threads() for engines in pairings for engine in engines))
+
+    # Get number of cores needed by all simultaneous games
+    def requiredCores(self) -> int:
+        return self.concurrency * self.threadsPerGame
+
+    # Check if there are more engine threads than cores
+    def isOversubscribed(self) -> bool:
+        return self.requiredCores() > len(self.cores)
+
+    # Describe that there are too many engine threads, which slows engines down and skews results
+    def oversubscriptionString(self) -> str:
+        return f"{self.concurrency} games with {self.threadsPerGame} thread(s) need {self.requiredCores()} cores, but only {len(self.cores)} are available"
+
+    # Get dedicated cores of a game slot
+    def slotCores(self, slot: int) -> list:
+        slot %= self.concurrency
+        return self.cores[slot * self.threadsPerGame : (slot + 1) * self.threadsPerGame]
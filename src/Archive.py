@@ -0,0 +1,200 @@
+import os
+import numpy as np
+import chess
+from src.GameRecord import GameRecord
+from src.TimeControl import TimeControl
+from src.Stats import runCounts
+
+# Compact archive of finished games, made of three files:
+# PATH: moves of all games as 16-bit codes (from square | to square << 6 | promotion piece << 12)
+# PATH.idx: fixed-size header record of every game, which also is the offset index into the moves
+# PATH.strings: engine names, time controls and start positions, one per line, referenced by their line number
+HEADER_DTYPE = np.dtype([
+    ("moveOffset", "<u8"), # Offset of the first move in the moves file, in moves
+    ("openingMoveCount", "<u2"), # Number of opening moves, which come before the engine moves
+    ("moveCount", "<u2"), # Number of engine moves
+    ("engine1", "<u4"), # String ids of the engines, time control and start position
+    ("engine2", "<u4"),
+    ("timeControl", "<u4"),
+    ("fen", "<u4"),
+    ("gameNr", "<u4"),
+    ("runId", "<u4"), # Number of the writer session, game numbers of different sessions start over
+    ("openingIndex", "<i4"), # Index of the opening in its book, -1 without book
+    ("whiteEngine", "u1"),
+    ("result", "u1"), # Index in RESULTS
+    ("termination", "u1"), # Index in TERMINATIONS
+    ("reason", "u1"), # Index in REASONS, 255 if unknown
+    ("duration", "<f4"), # Game timings in seconds, NaN if they weren't measured
+    ("meanThinkTime", "<f4"),
+    ("meanOverheadTime", "<f4"),
+    ("flagTimeLeft", "<f4")
+])
+
+RESULTS = ["1-0", "0-1", "1/2-1/2"]
+TERMINATIONS = ["normal", "time forfeit", "adjudication"]
+# Reason codes are stored in archives, so new reasons may only be appended
+REASONS = ["checkmate", "stalemate", "insufficient_material", "seventyfive_moves", "fivefold_repetition", "fifty_moves", "threefold_repetition", "variant_win", "variant_loss", "variant_draw",
+           "flag", "resign", "draw", "tablebase"]
+UNKNOWN_REASON = 255
+
+# Encode a move as 16-bit code
+def encodeMove(move: chess.Move) -> int:
+    promotion = move.promotion - 1 if move.promotion else 0
+    return move.from_square | move.to_square << 6 | promotion << 12
+
+# Decode a 16-bit move code
+def decodeMove(code: int) -> chess.Move:
+    promotion = code >> 12
+    return chess.Move(code & 63, code >> 6 & 63, promotion + 1 if promotion else None)
+
+# Read string table of an archive, empty if it doesn't exist yet
+def readStrings(path: str) -> list:
+    if not os.path.exists(path + ".strings"):
+        return []
+    with open(path + ".strings", "r", encoding="utf-8") as file:
+        return file.read().splitlines()
+
+# Read run id of the last game in a header file, -1 if there are no games yet (sessions only append, so it's the highest)
+def lastRunId(path: str, size: int) -> int:
+    if size < HEADER_DTYPE.itemsize:
+        return -1
+    with open(path, "rb") as file:
+        file.seek(size - HEADER_DTYPE.itemsize)
+        return int(np.frombuffer(file.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)["runId"][0])
+
+# Class for appending finished games to an archive
+class ArchiveWriter:
+    path: str
+    movesFile: object
+    headersFile: object
+    stringsFile: object
+    stringIds: dict # Ids of the strings in the string table
+    moveOffset: int # Number of moves in the moves file
+    runId: int # Number of this session, one higher than the last one in the archive
+
+    # Open archive for appending, so multiple matches can be written to it
+    def __init__(self, path: str):
+        self.path = path
+        self.stringIds = {string: i for i, string in enumerate(readStrings(path))}
+        self.movesFile = open(path, "ab")
+        self.headersFile = open(path + ".idx", "ab")
+
+        # Drop a header that was only partly written when QuintTest was killed
+        self.headersFile.truncate(self.headersFile.tell() - self.headersFile.tell() % HEADER_DTYPE.itemsize)
+        self.runId = lastRunId(path + ".idx", self.headersFile.tell()) + 1
+        self.stringsFile = open(path + ".strings", "a", encoding="utf-8")
+        self.moveOffset = self.movesFile.tell() // 2
+
+    # Get id of a string, adding it to the string table if it's new
+    def stringId(self, string: str) -> int:
+        if string not in self.stringIds:
+            self.stringIds[string] = len(self.stringIds)
+            self.stringsFile.write(string + "\n")
+        return self.stringIds[string]
+
+    # Append a finished game, with the index of its opening in the book (-1 without book)
+    def writeGame(self, record: GameRecord, engines: list, timeControl: TimeControl, openingIndex: int = -1) -> None:
+        moves = np.array([encodeMove(chess.Move.from_uci(move)) for move in record.openingMoves + record.moves], dtype="<u2")
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["moveOffset"] = self.moveOffset
+        header["openingMoveCount"] = len(record.openingMoves)
+        header["moveCount"] = len(record.moves)
+        header["engine1"] = self.stringId(engines[0].fullName())
+        header["engine2"] = self.stringId(engines[1].fullName())
+        header["timeControl"] = self.stringId(timeControl.toString())
+        header["fen"] = self.stringId(record.fen)
+        header["gameNr"] = record.gameNr
+        header["runId"] = self.runId
+        header["openingIndex"] = openingIndex
+        header["whiteEngine"] = record.whiteEngine
+        header["result"] = RESULTS.index(record.result)
+        header["termination"] = TERMINATIONS.index(record.termination)
+        header["reason"] = REASONS.index(record.reason) if record.reason in REASONS else UNKNOWN_REASON
+
+        timing = record.timing
+        header["duration"] = timing.duration if timing and timing.duration != None else np.nan
+        header["meanThinkTime"] = np.mean(timing.thinkTimes) if timing and timing.thinkTimes else np.nan
+        header["meanOverheadTime"] = np.mean(timing.overheadTimes) if timing and timing.overheadTimes else np.nan
+        header["flagTimeLeft"] = timing.flagTimeLeft if timing and timing.flagTimeLeft != None else np.nan
+
+        # Strings are written first, so every header only references strings that are in the file
+        self.stringsFile.flush()
+        self.movesFile.write(moves.tobytes())
+        self.movesFile.flush()
+        self.headersFile.write(header.tobytes())
+        self.headersFile.flush()
+        self.moveOffset += len(moves)
+
+    def close(self) -> None:
+        self.movesFile.close()
+        self.headersFile.close()
+        self.stringsFile.close()
+
+# Class for reading an archive through memory maps, queries work on the header records as a whole
+class ArchiveReader:
+    path: str
+    headers: np.ndarray # Header records of all games (memory mapped)
+    moveCodes: np.ndarray # Moves of all games (memory mapped)
+    strings: list
+
+    def __init__(self, path: str):
+        self.path = path
+        self.strings = readStrings(path)
+        self.headers = np.memmap(path + ".idx", dtype=HEADER_DTYPE, mode="r") if os.path.getsize(path + ".idx") else np.zeros(0, dtype=HEADER_DTYPE)
+        self.moveCodes = np.memmap(path, dtype="<u2", mode="r") if os.path.getsize(path) else np.zeros(0, dtype="<u2")
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    # Get id of a string, -1 if it isn't in the archive
+    def stringId(self, string: str) -> int:
+        return self.strings.index(string) if string in self.strings else -1
+
+    # Get engine (0 or 1) that won every game, -1 for draws
+    def winnerEngines(self) -> np.ndarray:
+        whiteEngines = self.headers["whiteEngine"].astype(np.int8)
+        results = self.headers["result"]
+        return np.where(results == 0, whiteEngines, np.where(results == 1, 1 - whiteEngines, -1))
+
+    # Get string ids of the engines that lost every game, -1 for draws
+    def losers(self) -> np.ndarray:
+        winnerEngines = self.winnerEngines()
+        return np.where(winnerEngines == 0, self.headers["engine2"].astype(np.int64), np.where(winnerEngines == 1, self.headers["engine1"].astype(np.int64), -1))
+
+    # Get indices of the games an engine lost on time
+    def timeLosses(self, engineName: str) -> np.ndarray:
+        timeForfeits = self.headers["termination"] == TERMINATIONS.index("time forfeit")
+        return np.flatnonzero(timeForfeits & (self.losers() == self.stringId(engineName)))
+
+    # Count results of every match (engines and time control) in the archive
+    # Games are paired within their run, then the counts of all runs of a match are added up
+    # Returns a list of (engine 1, engine 2, time control) and the trinomial and pentanomial counts in the same order
+    def matchCounts(self) -> tuple:
+        keys = np.stack([self.headers["runId"], self.headers["engine1"], self.headers["engine2"], self.headers["timeControl"]], axis=1).astype(np.int64)
+        runKeys, runIndices = np.unique(keys, axis=0, return_inverse=True) if len(keys) else (np.zeros((0, 4), dtype=np.int64), np.zeros(0, dtype=np.int64))
+        results = np.array(RESULTS)[self.headers["result"]]
+        runTrinomial, runPentanomial = runCounts(runIndices.ravel(), self.headers["gameNr"], self.headers["whiteEngine"], results, len(runKeys))
+
+        matchKeys, matchIndices = np.unique(runKeys[:, 1:], axis=0, return_inverse=True)
+        trinomial = np.zeros((len(matchKeys), 3), dtype=np.int64)
+        pentanomial = np.zeros((len(matchKeys), 5), dtype=np.int64)
+        np.add.at(trinomial, matchIndices.ravel(), runTrinomial)
+        np.add.at(pentanomial, matchIndices.ravel(), runPentanomial)
+        matches = [tuple(self.strings[stringId] for stringId in key) for key in matchKeys]
+        return matches, trinomial, pentanomial
+
+    # Get moves of a game, the opening moves first
+    def moves(self, index: int) -> list:
+        header = self.headers[index]
+        start = int(header["moveOffset"])
+        codes = self.moveCodes[start : start + int(header["openingMoveCount"]) + int(header["moveCount"])]
+        return [decodeMove(int(code)) for code in codes]
+
+    # Get record of a game (without comments and timings)
+    def record(self, index: int) -> GameRecord:
+        header = self.headers[index]
+        moves = [move.uci() for move in self.moves(index)]
+        openingMoveCount = int(header["openingMoveCount"])
+        reason = REASONS[header["reason"]] if header["reason"] != UNKNOWN_REASON else "unknown"
+        return GameRecord(int(header["gameNr"]), int(header["whiteEngine"]), self.strings[header["fen"]], moves[:openingMoveCount], moves[openingMoveCount:], None, RESULTS[header["result"]], TERMINATIONS[header["termination"]], reason)
@@ -0,0 +1,103 @@
+import asyncio, traceback
+import chess, chess.engine
+from typing import Iterator
+from src.Results import SharedResults, StartedEvent, RestartEvent, ErrorEvent, FinishedEvent
+from src.EnginePool import AsyncEnginePool
+from src.Game import Game
+from src.Openings import Opening
+from src.Affinity import CoreScheduler, pinProcess
+
+# Play games of matches on one event loop in the current thread, running a number of them at the same time
+def runAsyncGames(inputs: Iterator, resultsList: list, concurrency: int, coreScheduler: CoreScheduler = None) -> None:
+    try:
+        asyncio.run(playAsyncGames(inputs, resultsList, concurrency, coreScheduler))
+    except Exception:
+        resultsList[0].putEvent(ErrorEvent(traceback.format_exc()))
+
+    # Announce the end of all games to the first match
+    resultsList[0].putEvent(FinishedEvent())
+
+# Play games in slots that each start the next game as soon as their last one is finished
+# Every slot has its own cores if a core scheduler is given
+async def playAsyncGames(inputs: Iterator, resultsList: list, concurrency: int, coreScheduler: CoreScheduler = None) -> None:
+    enginePool = AsyncEnginePool()
+    remainingInputs = iter(inputs)
+
+    async def gameSlot(slot: int):
+        cores = coreScheduler.slotCores(slot) if coreScheduler else None
+        for pairingNr, gameNr, opening in remainingInputs:
+            await engineGameAsync(gameNr, opening, resultsList[pairingNr], enginePool, cores, f"slot {slot}")
+
+    try:
+        await asyncio.gather(*[gameSlot(slot) for slot in range(concurrency)])
+    finally:
+        # Close engine processes (important)
+        await enginePool.close()
+
+# Play an engine game on the event loop, starting from the standard position if there is no opening
+async def engineGameAsync(gameNr: int, opening: Opening, results: SharedResults, enginePool: AsyncEnginePool, cores: list = None, worker: str = "slot 0") -> None:
+    # Skip games of stopped matches without starting engines
+    if results.wasStopped():
+        return
+
+    engines = [results.engine1, results.engine2]
+    results.putEvent(StartedEvent(worker))
+
+    # Replay the game from the start with restarted engines if an engine crashed or timed out, as often as retries are left
+    for attempt in range(results.retries + 1):
+        engineProcesses = []
+        try:
+            # Get live processes of the engines, they're told about the new game with ucinewgame
+            engineProcesses = [await enginePool.acquire(engine) for engine in engines]
+
+            # Move engines to the cores of the slot, as idle processes are shared between all slots
+            if cores:
+                for engineProcess in engineProcesses:
+                    pinProcess(engineProcess.transport.get_pid(), cores)
+
+            # Set up new match
+            game = Game(gameNr, opening, results.timeControl, results.adjudication, results.recordMoveInfo, results.moveGrace)
+
+            # Play chess moves until the game ends or the match is aborted
+            while not game.isOver() and not results.wasStopped():
+                # Check which engine's move it is
+                engineNr = game.engineToMove()
+
+                try:
+                    # Get the engine's move choice with the given time limit, giving up after the move's timeout
+                    limit = game.startMove()
+                    moveResult = await asyncio.wait_for(engineProcesses[engineNr].play(game.board, limit, game=game.gameId, info=game.info), game.moveTimeout(limit))
+                except (chess.engine.EngineError, asyncio.TimeoutError) as e:
+                    # Kill engine that crashed or timed out, it's restarted for the next game
+                    await enginePool.discard(engineProcesses[engineNr])
+                    engineProcesses[engineNr] = None
+                    results.addEngineFault(isinstance(e, asyncio.TimeoutError))
+                    results.putEvent(RestartEvent(worker))
+
+                    # Handle engine errors by passing on a string of played moves to the error
+                    raise game.engineError(engines[engineNr]) from e
+
+                # Play move on the board
+                game.finishMove(moveResult)
+
+            # Change results based on who won (or draw), unless the match was aborted
+            if not results.wasStopped():
+                game.recordResult(results)
+            return
+
+        # Send errors of the last attempt to main thread
+        except chess.engine.EngineError:
+            if attempt == results.retries or results.wasStopped():
+                results.putEvent(ErrorEvent(traceback.format_exc()))
+                return
+
+        # Send all other errors to main thread
+        except Exception:
+            results.putEvent(ErrorEvent(traceback.format_exc()))
+            return
+
+        # Return engines to pool (important)
+        finally:
+            for engine, engineProcess in zip(engines, engineProcesses):
+                if engineProcess != None:
+                    enginePool.release(engine, engineProcess)
@@ -0,0 +1,35 @@
+import time
+from src.Engine import MockEngine
+from src.TimeControl import TimeControl
+from src.MatchSettings import MatchSettings
+import src.EngineMatch
+
+# Function for measuring how many games QuintTest itself sustains, playing the bundled fake engine against itself
+def bench(concurrencies: list, timeControls: list, games: int, backend: str = "process", latency: float = 0.0, crash: float = 0.0, hang: float = 0.0, outputName: str = None):
+    # Create fake engines that answer after the latency and inject crashes and timeouts
+    mockArgs = ["--latency", str(latency), "--crash", str(crash), "--hang", str(hang)]
+    engines = [MockEngine("MockEngine1", mockArgs), MockEngine("MockEngine2", mockArgs)]
+
+    # Save output string
+    outputString = f"{'Concurrency':>11} {'Time control':>12} {'Games':>6} {'Errors':>6} {'Games/s':>8} {'Plies/s':>8} {'Overhead/ply':>12}\n"
+    print(outputString, end="")
+
+    for timeControlString in timeControls:
+        timeControl = TimeControl(timeControlString)
+        for concurrency in concurrencies:
+            # Time a match, including starting and closing the processes
+            startTime = time.perf_counter()
+            results = src.EngineMatch.engineMatch(engines, MatchSettings(games, timeControl, processes=concurrency, suppressOutput=True, backend=backend))
+            duration = time.perf_counter() - startTime
+
+            # Games that weren't recorded failed because of engine errors
+            plies = results.timingStats.thinkTimes.count
+            overhead = results.timingStats.overheadTimes.mean() * 1000
+            line = f"{concurrency:>11} {timeControlString:>12} {results.gameAmount():>6} {games - results.gameAmount():>6} {results.gameAmount() / duration:>8.2f} {plies / duration:>8.0f} {overhead:>10.3f}ms\n"
+            print(line, end="")
+            outputString += line
+
+    # Write output if needed
+    if outputName:
+        with open("output/" + outputName, "w") as file:
+            file.write(outputString)
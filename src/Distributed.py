@@ -0,0 +1,295 @@
+from __future__ import annotations
+import json, signal, socket, socketserver, threading, traceback
+from collections import deque
+from multiprocessing import Pool
+from inspect import FrameInfo
+from src.Engine import Engine
+from src.TimeControl import TimeControl, MOVE_GRACE
+from src.Openings import Opening
+from src.Adjudication import Adjudication
+from src.GameRecord import GameRecord
+from src.MatchSettings import MatchSettings
+from src.EngineMatch import MatchRun, initWorker, playPoolGame
+
+# Number of batches a worker gets at the same time, so it doesn't wait for the next one after finishing a batch
+BATCHES_PER_WORKER = 2
+
+# Send a message as a JSON line
+def sendMessage(stream, message: dict) -> None:
+    stream.write((json.dumps(message) + "\n").encode())
+    stream.flush()
+
+# Class for a worker connected to the coordinator
+class WorkerConnection:
+    stream: object
+    name: str # Address of the worker, engine restarts are counted by it
+    batchSize: int # Number of games in a batch, the worker's concurrency if not set
+    batches: dict # Unfinished games of every batch of the worker by (pairing number, game number)
+
+    def __init__(self, stream, name: str, batchSize: int):
+        self.stream = stream
+        self.name = name
+        self.batchSize = batchSize
+        self.batches = {}
+
+# Class for handing out the games of matches to workers in batches and collecting their results
+# Games of workers that disconnect are handed out again
+class Coordinator:
+    matchRun: MatchRun
+    matchesMessage: dict # Engines and settings of the matches, sent to every worker
+    batchSize: int
+    lock: threading.Lock
+    pendingGames: deque # Games that aren't assigned to a worker as (pairing number, game number, opening number)
+    workers: list
+    nextBatchId: int
+    finished: threading.Event # Set once all games are finished
+
+    def __init__(self, matchRun: MatchRun):
+        settings = matchRun.settings
+        self.matchRun = matchRun
+        self.matchesMessage = {
+            "type": "matches",
+            "pairings": [[[engine.name, engine.params, engine.options] for engine in engines] for engines in matchRun.pairings],
+            "timeControl": settings.timeControl.toString(),
+            "adjudication": settings.adjudication.toDict() if settings.adjudication else None,
+            "recordMoveInfo": settings.recordMoveInfo,
+            "moveGrace": settings.moveGrace,
+            "retries": settings.retries
+        }
+        self.batchSize = settings.batchSize
+        self.lock = threading.Lock()
+        self.pendingGames = deque(matchRun.inputs)
+        self.workers = []
+        self.nextBatchId = 0
+        self.finished = threading.Event()
+
+        with self.lock:
+            self.checkFinished()
+
+    # Register a new worker and give it its first batches
+    def addWorker(self, stream, name: str, concurrency: int) -> WorkerConnection:
+        worker = WorkerConnection(stream, name, self.batchSize or concurrency)
+        with self.lock:
+            self.workers.append(worker)
+            sendMessage(stream, self.matchesMessage)
+            self.dispatch()
+            self.checkFinished()
+        return worker
+
+    # Count a finished game of a worker
+    def recordGame(self, worker: WorkerConnection, batchId: int, pairingNr: int, record: GameRecord, crashes: int, timeouts: int) -> None:
+        with self.lock:
+            self.addEngineFaults(worker, pairingNr, crashes, timeouts)
+            # Games of stopped matches aren't counted, like games that are aborted locally
+            sharedResults = self.matchRun.resultsList[pairingNr]
+            if not sharedResults.wasStopped():
+                sharedResults.addRecord(record)
+                self.matchRun.recordGame(pairingNr, record)
+            self.finishGame(worker, batchId, pairingNr, record.gameNr)
+
+    # Output a game that failed on a worker, it isn't played again
+    def reportError(self, worker: WorkerConnection, batchId: int, pairingNr: int, gameNr: int, error: str, crashes: int, timeouts: int) -> None:
+        with self.lock:
+            self.addEngineFaults(worker, pairingNr, crashes, timeouts)
+            self.matchRun.reportError(pairingNr, error)
+            self.finishGame(worker, batchId, pairingNr, gameNr)
+
+    # Count the engines that crashed or timed out during a game of a worker, like engines of local games
+    def addEngineFaults(self, worker: WorkerConnection, pairingNr: int, crashes: int, timeouts: int) -> None:
+        sharedResults = self.matchRun.resultsList[pairingNr]
+        for timedOut in [False] * crashes + [True] * timeouts:
+            sharedResults.addEngineFault(timedOut)
+            self.matchRun.metrics.restartEngine(pairingNr, worker.name)
+
+    # Remove a game from its batch, giving the worker a new batch once one is finished
+    def finishGame(self, worker: WorkerConnection, batchId: int, pairingNr: int, gameNr: int) -> None:
+        batch = worker.batches.get(batchId, {})
+        batch.pop((pairingNr, gameNr), None)
+        if not batch:
+            worker.batches.pop(batchId, None)
+            self.dispatch()
+        self.checkFinished()
+
+    # Hand out the unfinished games of a disconnected worker to the other workers again
+    def removeWorker(self, worker: WorkerConnection) -> None:
+        with self.lock:
+            self.workers.remove(worker)
+            for batch in reversed(list(worker.batches.values())):
+                self.pendingGames.extendleft(reversed(list(batch.values())))
+            worker.batches = {}
+            self.dispatch()
+            self.checkFinished()
+
+    # Give batches to all workers that have room for them, skipping games of stopped matches
+    def dispatch(self) -> None:
+        for worker in list(self.workers):
+            while len(worker.batches) < BATCHES_PER_WORKER:
+                batch = {}
+                while self.pendingGames and len(batch) < worker.batchSize:
+                    pairingNr, gameNr, openingNr = self.pendingGames.popleft()
+                    if not self.matchRun.resultsList[pairingNr].wasStopped():
+                        batch[(pairingNr, gameNr)] = (pairingNr, gameNr, openingNr)
+                if not batch:
+                    return
+
+                batchId = self.nextBatchId
+                self.nextBatchId += 1
+                worker.batches[batchId] = batch
+                # Openings are only read from the book when their games are handed out
+                openings = [self.matchRun.opening(openingNr) for _, _, openingNr in batch.values()]
+                games = [[pairingNr, gameNr, [opening.fen, opening.moves] if opening else None] for (pairingNr, gameNr, _), opening in zip(batch.values(), openings)]
+                try:
+                    sendMessage(worker.stream, {"type": "batch", "batchId": batchId, "games": games})
+                except OSError:
+                    # Worker is gone, its games are handed out again when its connection is closed
+                    break
+
+    # Check if no games are left, games of stopped matches don't have to be played
+    def checkFinished(self) -> None:
+        isStopped = lambda pairingNr: self.matchRun.resultsList[pairingNr].wasStopped()
+        if any(sharedResults.wasStopped() for sharedResults in self.matchRun.resultsList):
+            self.pendingGames = deque(game for game in self.pendingGames if not isStopped(game[0]))
+
+        runningGames = [key for worker in self.workers for batch in worker.batches.values() for key in batch]
+        if not self.pendingGames and all(isStopped(pairingNr) for pairingNr, _ in runningGames):
+            self.finished.set()
+
+    # Tell all workers to exit
+    def stopWorkers(self) -> None:
+        with self.lock:
+            for worker in self.workers:
+                try:
+                    sendMessage(worker.stream, {"type": "stop"})
+                except OSError:
+                    pass
+
+# Class for handling the connection of one worker, which sends finished games as JSON lines
+class WorkerHandler(socketserver.StreamRequestHandler):
+    server: CoordinatorServer
+
+    def handle(self) -> None:
+        coordinator = self.server.coordinator
+        worker = None
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                if message["type"] == "hello":
+                    worker = coordinator.addWorker(self.wfile, f"{self.client_address[0]}:{self.client_address[1]}", message["concurrency"])
+                elif message["type"] == "game":
+                    coordinator.recordGame(worker, message["batchId"], message["pairingNr"], GameRecord.fromDict(message["record"]), message["crashes"], message["timeouts"])
+                elif message["type"] == "error":
+                    coordinator.reportError(worker, message["batchId"], message["pairingNr"], message["gameNr"], message["error"], message["crashes"], message["timeouts"])
+        except (OSError, ValueError):
+            # Treat broken connections and messages like disconnects
+            pass
+        finally:
+            if worker:
+                coordinator.removeWorker(worker)
+
+# Class for the TCP server that workers connect to
+class CoordinatorServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    coordinator: Coordinator
+
+    def __init__(self, address: tuple, coordinator: Coordinator):
+        self.coordinator = coordinator
+        super().__init__(address, WorkerHandler)
+
+# Play matches on workers connected over TCP, merging their games into the results, PGN file and store like local games
+def serveMatches(pairings: list, settings: MatchSettings, address: tuple) -> list:
+    interrupted = False
+
+    # Handle keyboard interrupt by stopping all matches, games that are still running on workers are dropped
+    def handleKeyboardInterrupt(sig: int, frame: FrameInfo):
+        nonlocal interrupted
+        interrupted = True
+        matchRun.stopMatches()
+
+    matchRun = MatchRun(pairings, settings)
+    coordinator = Coordinator(matchRun)
+
+    with CoordinatorServer(address, coordinator) as server:
+        if not settings.suppressOutput:
+            matchRun.progressBars[0].write(f"Waiting for workers on {address[0]}:{server.server_address[1]}")
+        serverThread = threading.Thread(target=server.serve_forever, daemon=True)
+        serverThread.start()
+
+        # Handle keyboard interrupts
+        signal.signal(signal.SIGINT, handleKeyboardInterrupt)
+
+        # Wait with a timeout, so keyboard interrupts are handled on every platform
+        while not coordinator.finished.wait(1) and not interrupted:
+            pass
+
+        coordinator.stopWorkers()
+        server.shutdown()
+
+    return matchRun.finish()
+
+# Play games handed out by a coordinator with local engines, until it's finished
+def runWorker(host: str, port: int, concurrency: int, tablebases: str = None) -> None:
+    connection = socket.create_connection((host, port))
+    stream = connection.makefile("rwb")
+    sendLock = threading.Lock()
+
+    # Send message from the main thread or the pool's result thread
+    def send(message: dict) -> None:
+        with sendLock:
+            try:
+                sendMessage(stream, message)
+            except OSError:
+                # Coordinator is gone, the game is played again by another worker
+                pass
+
+    # Create callbacks that send the result of a game with the crashes and timeouts of its engines, which are only counted by the coordinator
+    def gameCallback(batchId: int, pairingNr: int, gameNr: int):
+        def sendGame(result: tuple) -> None:
+            record, error, crashes, timeouts = result
+            if record:
+                send({"type": "game", "batchId": batchId, "pairingNr": pairingNr, "record": record.toDict(), "crashes": crashes, "timeouts": timeouts})
+            else:
+                send({"type": "error", "batchId": batchId, "pairingNr": pairingNr, "gameNr": gameNr, "error": error, "crashes": crashes, "timeouts": timeouts})
+        return sendGame
+
+    def errorCallback(batchId: int, pairingNr: int, gameNr: int):
+        return lambda error: send({"type": "error", "batchId": batchId, "pairingNr": pairingNr, "gameNr": gameNr, "error": "".join(traceback.format_exception(error)), "crashes": 0, "timeouts": 0})
+
+    send({"type": "hello", "concurrency": concurrency})
+    print(f"Connected to {host}:{port}, playing {concurrency} games simultaneously")
+
+    pairings = timeControl = adjudication = None
+    recordMoveInfo = False
+    moveGrace = MOVE_GRACE
+    retries = 0
+    pool = Pool(concurrency, initializer=initWorker, initargs=([],))
+    try:
+        for line in stream:
+            message = json.loads(line)
+            if message["type"] == "matches":
+                # Find engines locally and set up the matches
+                pairings = [[Engine(name, params, options) for name, params, options in engines] for engines in message["pairings"]]
+                timeControl = TimeControl(message["timeControl"])
+                if message["adjudication"]:
+                    adjudication = Adjudication.fromDict(message["adjudication"], tablebases)
+                elif tablebases:
+                    adjudication = Adjudication(tablebasePath=tablebases)
+                recordMoveInfo = message["recordMoveInfo"]
+                moveGrace = message["moveGrace"]
+                retries = message["retries"]
+            elif message["type"] == "batch":
+                for pairingNr, gameNr, opening in message["games"]:
+                    opening = Opening(*opening) if opening else None
+                    pool.apply_async(playPoolGame, (pairings[pairingNr], timeControl, gameNr, opening, adjudication, recordMoveInfo, moveGrace, retries),
+                        callback=gameCallback(message["batchId"], pairingNr, gameNr), error_callback=errorCallback(message["batchId"], pairingNr, gameNr))
+            elif message["type"] == "stop":
+                break
+    except KeyboardInterrupt:
+        # Let processes finish the games they got and exit normally, so they close their engine processes
+        print("Finishing running games")
+        pool.close()
+        pool.join()
+    finally:
+        # Games of a stopped run or a lost coordinator aren't needed anymore, terminated processes kill their engines
+        pool.terminate()
+        connection.close()
@@ -1,24 +1,50 @@
 from __future__ import annotations
-import sys, os, subprocess, errno
+import sys, os, shutil, errno, hashlib, json
 import chess, chess.engine
 
+# Resolved paths of engine executables with their modification times, by engine name and working directory
+resolvedPaths = {}
+
+# Hashes of files by path and modification time, so executables are only read again after they changed
+fileHashes = {}
+
+# Get modification time of an executable, None if it doesn't exist anymore
+def executableModificationTime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+# Get SHA-256 hash of a file's content
+def fileHash(path: str) -> str:
+    cacheKey = (path, executableModificationTime(path))
+    if cacheKey not in fileHashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        fileHashes[cacheKey] = digest.hexdigest()
+    return fileHashes[cacheKey]
+
 # Class for managing engines and their executables
 class Engine:
     name: str
     params: list
+    options: dict # UCI options set when the engine process is started, like Threads or Hash
     path: str
 
-    # Create engine based on name and command line arguments
-    def __init__(self, name: str, params: list):
+    # Create engine based on name, command line arguments and UCI options
+    def __init__(self, name: str, params: list, options: dict = None):
         self.name = name
         self.params = params
+        self.options = options if options != None else {}
 
         # Save path of engine
         self.path = self.getPath()
 
     # Initialize name and parameters from a full name
     @classmethod
-    def fromName(cls, namePar: str):
+    def fromName(cls, namePar: str, options: dict = None):
         if "_params_" in namePar:
             # Parse name and parameters from string, like "QuintBot_params_300_500_0.5" -> "QuintBot", [300, 500, 0.5]
             name = namePar[:namePar.index("_params_")]
@@ -29,7 +55,7 @@ class Engine:
             name = namePar
             params = []
 
-        return cls(name, params)
+        return cls(name, params, options)
 
     # Give full name of engine, potentially stripping of .exe and adding command line arguments
     def fullName(self) -> str:
@@ -45,38 +71,99 @@ class Engine:
 
         return name
 
-    # Check if a path points to an executable
-    def pathExec(self, path: str) -> bool:
-        try:
-            # Try to run file with path
-            p = subprocess.Popen(path, stdout=subprocess.DEVNULL)
-            p.terminate()
-            return True
-        except OSError:
-            # Return False if file isn't found
-            return False
-        except subprocess.CalledProcessError:
-            # Return False if file returns error
-            return False
-
-    # Get path of engine executable
-    def getPath(self) -> None:
+    # Get path of engine executable, using the cached path if the executable hasn't changed since
+    def getPath(self) -> str:
+        cacheKey = (self.name, os.getcwd())
+        if cacheKey in resolvedPaths:
+            path, modificationTime = resolvedPaths[cacheKey]
+            if executableModificationTime(path) == modificationTime:
+                return path
+
+        path = self.findPath()
+        resolvedPaths[cacheKey] = (path, executableModificationTime(path))
+        return path
+
+    # Find path of engine executable without running it
+    def findPath(self) -> str:
         # Check if file exists in path
-        if self.pathExec(self.name):
-            return self.name
+        path = shutil.which(self.name)
+        if path:
+            return path
 
         # Check if file exists in main directory
-        if self.pathExec(os.getcwd() + "/" + self.name):
-            return os.getcwd() + "/" + self.name
+        path = shutil.which(os.getcwd() + "/" + self.name)
+        if path:
+            return path
 
         # Check if file exists in engine directory
-        installedPath = os.path.dirname(os.path.abspath(sys.argv[0])) + "/engines/" + self.name
-        if self.pathExec(installedPath):
-            return installedPath
+        path = shutil.which(os.path.dirname(os.path.abspath(sys.argv[0])) + "/engines/" + self.name)
+        if path:
+            return path
         
         # If no path is found return error
         raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.name)
 
+    # Get command that starts the engine process
+    def command(self) -> list:
+        return [self.path] + [str(arg) for arg in self.params]
+
+    # Get key that identifies interchangeable processes, which have the same command and options
+    def processKey(self) -> tuple:
+        return tuple(self.command()) + tuple(sorted(self.options.items()))
+
+    # Get hash of the engine's executable, which changes with every new build
+    def binaryHash(self) -> str:
+        return fileHash(self.path)
+
+    # Get key that identifies the engine by its binary, command line arguments and options instead of its file name
+    def identity(self) -> str:
+        content = json.dumps([self.binaryHash(), self.command()[1:], sorted(self.options.items())])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    # Get number of threads the engine searches with
+    def threads(self) -> int:
+        return int(self.options.get("Threads", 1))
+
+    # Get the options that are supported by an engine process
+    def supportedOptions(self, processOptions: dict) -> dict:
+        return {name: value for name, value in self.options.items() if name in processOptions}
+
     # Create engine process for engine
     def createProcess(self) -> chess.engine.SimpleEngine:
-        return chess.engine.SimpleEngine.popen_uci([self.path] + [str(arg) for arg in self.params], setpgrp=True) # New process group, so keyboard interrupts aren't passed on
\ No newline at end of file
+        process = chess.engine.SimpleEngine.popen_uci(self.command(), setpgrp=True) # New process group, so keyboard interrupts aren't passed on
+        process.configure(self.supportedOptions(process.options))
+        return process
+
+    # Create engine process for engine on the running event loop
+    async def createProtocol(self) -> chess.engine.UciProtocol:
+        _, protocol = await chess.engine.popen_uci(self.command(), setpgrp=True)
+        await protocol.configure(self.supportedOptions(protocol.options))
+        return protocol
+
+# Class for the bundled fake engine (src/MockEngine.py), which is run with the current Python interpreter
+class MockEngine(Engine):
+    mockArgs: list # Command line arguments of the fake engine, like ["--latency", "0.001", "--crash", "0.01"]
+
+    # Create fake engine, the name tells apart engines with different arguments
+    def __init__(self, name: str = "MockEngine", mockArgs: list = None, options: dict = None):
+        self.mockArgs = mockArgs if mockArgs != None else []
+        super().__init__(name, [], options)
+
+    # Use the Python interpreter as executable, or the QuintTest executable itself if it's built with PyInstaller
+    def getPath(self) -> str:
+        return sys.executable
+
+    # Hash the fake engine script, the interpreter doesn't tell apart different versions
+    # The built executable contains the script
+    def binaryHash(self) -> str:
+        return fileHash(self.path if isFrozen() else self.command()[1])
+
+    # Get command that starts the fake engine script, built executables run it with their hidden mock-engine command
+    def command(self) -> list:
+        if isFrozen():
+            return [self.path, "mock-engine"] + self.mockArgs
+        return [self.path, os.path.join(os.path.dirname(os.path.abspath(__file__)), "MockEngine.py")] + self.mockArgs
+
+# Check if QuintTest runs as an executable built with PyInstaller, which has no Python interpreter or source files
+def isFrozen() -> bool:
+    return getattr(sys, "frozen", False)
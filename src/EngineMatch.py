@@ -1,133 +1,500 @@
-import time, signal, traceback
+import os, signal, traceback, asyncio, threading
 import chess, chess.engine
-from multiprocessing import Pool, Manager
+from multiprocessing import Pool, Value
+from multiprocessing.connection import wait
+from multiprocessing.util import Finalize
 from tqdm import tqdm
 from inspect import FrameInfo
-from src.Results import Results, SharedResults, MatchEvent, ErrorEvent
-from src.TimeControl import TimeControl, MatchTime
+from typing import Iterator
+from src.Results import Results, SharedResults, Event, MatchEvent, StartedEvent, RestartEvent, FinishedEvent, ErrorEvent
+from src.Game import Game
+from src.GameRecord import GameRecord
+from src.TimeControl import TimeControl, MOVE_GRACE
+from src.EnginePool import EnginePool
+from src.Openings import Opening
+from src.AsyncMatch import runAsyncGames
+from src.Adjudication import Adjudication
+from src.ResultStore import matchKey, cacheKey, openingKey
+from src.Timing import TimingStats
+from src.Metrics import Metrics, MetricsServer
+from src.Affinity import CoreScheduler, canPinProcesses, pinProcess
+from src.MatchSettings import MatchSettings
+
+# Engine processes of the current worker process, kept alive across games
+workerEnginePool = None
+
+# Idle engine processes a worker process keeps, the two engines of its last game
+# Matches of other engines start their own processes, so a worker doesn't hold every engine it has played
+WORKER_IDLE_PROCESSES = 2
+
+# Shared results of all matches of the current worker process, passed on when it's created
+workerResults = None
+
+# Play match between two engines, either with one process per game ("process") or all games on one event loop ("asyncio")
+def engineMatch(engines: list, settings: MatchSettings) -> Results:
+    return engineMatches([engines], settings)[0]
+
+# Play matches between multiple pairs of engines at the same time, interleaving their games so all processes stay busy until the last game
+def engineMatches(pairings: list, settings: MatchSettings) -> list:
+    # Check if the games have enough cores for the threads of their engines
+    coreScheduler = CoreScheduler.forPairings(pairings, settings.processes)
+    affinity = settings.affinity
+    if coreScheduler.isOversubscribed():
+        # Refuse to pin games to cores that other games also use
+        if affinity:
+            raise ValueError(coreScheduler.oversubscriptionString() + ", lower the concurrency or the engine threads")
+        if not settings.suppressOutput:
+            print("Warning: " + coreScheduler.oversubscriptionString())
+
+    # Only give games dedicated cores if requested and supported
+    if affinity and not canPinProcesses():
+        if not settings.suppressOutput:
+            print("Warning: Pinning engines to cores isn't supported on this platform")
+        affinity = False
+    if not affinity:
+        coreScheduler = None
+
+    # Set up results and output of the matches
+    matchRun = MatchRun(pairings, settings)
+    resultsList = matchRun.resultsList
 
-# Play match between two engines
-def engineMatch(engines: list, games: int, timeControl: TimeControl, processes: int, suppressOutput: bool = False) -> Results:
     # Handle keyboard interrupt in main process
     def handleKeyboardInterrupt(sig: int, frame: FrameInfo):
-        sharedResults.stopMatch()
-
-    # Create shared results
-    manager = Manager()
-    sharedResults = SharedResults(engines[0], engines[1], 0, 0, 0, timeControl, manager)
-
-    if not suppressOutput:
-        # Create match output (engine names and progress bar)
-        print(f"Engine match: {engines[0].fullName()} vs {engines[1].fullName()}")
-        progressBar = tqdm(desc=f"Score: {sharedResults.scoreString()}", total=games, dynamic_ncols=True, unit="games")
-
-    # Create pool of processes
-    with Pool(processes) as pool:
-        # Distribute games across processes with same amount of white and black pieces
-        inputs = [(i % 2, sharedResults) for i in range(games)]
-        asyncResult = pool.starmap_async(engineGame, inputs)
-        
+        matchRun.stopMatches()
+
+    # Handle an event sent by a game of a match
+    def handleEvent(pairingNr: int, event: Event):
+        if isinstance(event, MatchEvent):
+            matchRun.recordGame(pairingNr, event.record)
+        elif isinstance(event, ErrorEvent):
+            matchRun.reportError(pairingNr, event.error)
+        elif isinstance(event, StartedEvent):
+            matchRun.metrics.startGame(pairingNr)
+        elif isinstance(event, RestartEvent):
+            matchRun.metrics.restartEngine(pairingNr, event.worker)
+
+    # Handle all events sent by games as soon as they arrive, until games are ready
+    def handleEvents():
+        eventReaders = {sharedResults.eventReader: pairingNr for pairingNr, sharedResults in enumerate(resultsList)}
+        while True:
+            # Wait with a timeout, so keyboard interrupts are handled on every platform
+            for eventReader in wait(list(eventReaders), 1):
+                pairingNr = eventReaders[eventReader]
+                event = resultsList[pairingNr].getEvent()
+                if isinstance(event, FinishedEvent):
+                    # Handle events of other matches that are still waiting
+                    for otherPairingNr, sharedResults in enumerate(resultsList):
+                        while sharedResults.hasEvent():
+                            handleEvent(otherPairingNr, sharedResults.getEvent())
+                    return
+                handleEvent(pairingNr, event)
+
+    # End of all games is announced to the first match
+    def finish(_):
+        resultsList[0].putEvent(FinishedEvent())
+
+    if settings.backend == "asyncio":
+        # Play games on an event loop in a separate thread, which announces the end of all games
+        gameThread = threading.Thread(target=runAsyncGames, args=(matchRun.openedInputs(), resultsList, settings.processes, coreScheduler))
+        gameThread.start()
+
         # Handle keyboard interrupts
         signal.signal(signal.SIGINT, handleKeyboardInterrupt)
 
-        # Wait until games are ready
-        while not asyncResult.ready():
-            time.sleep(0.1)
-
-            # Handle all events sent by child processes
-            while sharedResults.hasEvent():
-                event = sharedResults.getEvent()
-                if isinstance(event, MatchEvent):
-                    if not suppressOutput:
-                        # Update score after completed match
-                        progressBar.set_description(f"Score: {sharedResults.scoreString()}")
-                        progressBar.update(1)
-                elif isinstance(event, ErrorEvent):
-                    if not suppressOutput:
-                        # Output error after one is encountered
-                        progressBar.write(event.error)
-
-    if not suppressOutput:
-        # Cleanup
-        progressBar.close()
-        print()
-
-    # Return pure results
-    return sharedResults.toResults()
-
-# Play an engine game in a child process
-def engineGame(whiteEngine: int, results: SharedResults) -> None:
+        handleEvents()
+        gameThread.join()
+    else:
+        # Create pool of processes, which get the shared results and their cores on creation
+        with Pool(settings.processes, initializer=initWorker, initargs=(resultsList, coreScheduler, Value("i", 0))) as pool:
+            # Distribute games across processes, their openings are read as they're handed out, announce the end of all games
+            def playGames():
+                games = pool.imap_unordered(playWorkerGame, matchRun.openedInputs(), chunksize=1)
+                while True:
+                    try:
+                        next(games)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        # Errors of games are sent by the games themselves, this is an error of the book
+                        resultsList[0].putEvent(ErrorEvent(traceback.format_exc()))
+                finish(None)
+
+            threading.Thread(target=playGames, daemon=True).start()
+
+            # Handle keyboard interrupts
+            signal.signal(signal.SIGINT, handleKeyboardInterrupt)
+
+            handleEvents()
+
+            # Let workers exit normally, so they close their engine processes
+            pool.close()
+            pool.join()
+
+    return matchRun.finish()
+
+# Class for the main process side of matches: their results, output and the recording of finished games, wherever they are played
+class MatchRun:
+    pairings: list
+    settings: MatchSettings
+    resultsList: list # Shared results of every match
+    runIds: list # Store runs of every match
+    cacheKeys: list # Cache keys of every match, by the identities of its engines
+    progressBars: list
+    timingStatsList: list
+    metrics: Metrics # Live metrics of the matches, collected from the events of their games
+    metricsServer: MetricsServer # HTTP server of the metrics, None if they aren't served
+    inputs: list # Games that aren't finished yet as (pairing number, game number, opening number), the opening number is None without book
+    lastOpening: tuple # Last opening read from the book as (opening number, opening)
+
+    # Create results of the matches, continuing their latest runs in the store if needed
+    # With top up, games of earlier runs with the same engine binaries, options, time control and openings are reused
+    def __init__(self, pairings: list, settings: MatchSettings):
+        self.pairings = pairings
+        self.settings = settings
+        self.resultsList = []
+        self.runIds = []
+        self.cacheKeys = [cacheKey(engines, settings.timeControl, settings.adjudication) for engines in pairings] if settings.store else []
+        self.progressBars = []
+        self.timingStatsList = [TimingStats() for _ in pairings]
+
+        finishedGameNrs = []
+        cachedGamesList = []
+        for pairingNr, engines in enumerate(pairings):
+            # Continue the latest run of the match from its recorded games if needed, otherwise start a new run
+            finishedRecords = []
+            runId = None
+            if settings.store:
+                runId = settings.store.latestRun(matchKey(engines, settings.timeControl, settings.openingBook, settings.adjudication)) if settings.resume else None
+                if runId != None:
+                    finishedRecords = settings.store.games(runId)
+                else:
+                    runId = settings.store.createRun(matchKey(engines, settings.timeControl, settings.openingBook, settings.adjudication), settings.games)
+            self.runIds.append(runId)
+            finishedGameNrs.append(set(record.gameNr for record in finishedRecords))
+            cachedGamesList.append(settings.store.cachedGames(self.cacheKeys[pairingNr]) if settings.store and settings.topUp else {})
+
+            # Create shared results, including the games that were already finished
+            sharedResults = SharedResults(engines[0], engines[1], 0, 0, 0, settings.timeControl, settings.sprt, settings.adjudication, recordMoveInfo=settings.recordMoveInfo, moveGrace=settings.moveGrace, retries=settings.retries)
+            for record in finishedRecords:
+                sharedResults.addRecord(record)
+                sharedResults.addPairGame(record)
+            self.resultsList.append(sharedResults)
+
+            if not settings.suppressOutput:
+                # Create match output (engine names)
+                print(f"Engine match: {matchName(engines)}")
+
+        # Distribute games that aren't finished yet, taking turns between the matches, games alternate colors
+        # Every opening is played twice with reversed colors, openings are only read from the book when their games are handed out
+        # Cached games take the place of games with the same opening and colors, games that were finished in the resumed run already used theirs
+        self.inputs = []
+        self.lastOpening = (None, None)
+        reusedGames = [0] * len(pairings)
+        for i in range(settings.games):
+            openingNr = i // 2 if settings.openingBook else None
+            for pairingNr in range(len(pairings)):
+                # Only top up needs the opening now, to find cached games with it
+                cachedGames = []
+                if cachedGamesList[pairingNr]:
+                    opening = self.opening(openingNr)
+                    fen, openingMoves = (opening.fen, opening.moves) if opening else (chess.STARTING_FEN, [])
+                    cachedGames = cachedGamesList[pairingNr].get((openingKey(fen, openingMoves), i % 2), [])
+
+                if i in finishedGameNrs[pairingNr]:
+                    if cachedGames:
+                        cachedGames.pop(0)
+                elif cachedGames:
+                    self.reuseGame(pairingNr, cachedGames.pop(0), i, fen, openingMoves)
+                    reusedGames[pairingNr] += 1
+                else:
+                    self.inputs.append((pairingNr, i, openingNr))
+
+        # Cached games can already be enough for the SPRT to accept a hypothesis
+        if settings.sprt:
+            for sharedResults in self.resultsList:
+                if sharedResults.sprtResult() != None:
+                    sharedResults.stopMatch()
+
+        # Serve live metrics of the matches over HTTP if needed
+        self.metrics = Metrics(self.resultsList, [matchName(engines) for engines in pairings])
+        self.metricsServer = MetricsServer(settings.metricsAddress, self.metrics) if settings.metricsAddress else None
+
+        if not settings.suppressOutput:
+            if settings.metricsAddress:
+                print(f"Serving metrics on http://{settings.metricsAddress[0]}:{self.metricsServer.server_address[1]}/metrics")
+            if settings.topUp:
+                for engines, reusedGameAmount in zip(pairings, reusedGames):
+                    print(f"Reusing {reusedGameAmount} cached games of {matchName(engines)}")
+
+            # Create a progress bar for every match
+            for pairingNr, sharedResults in enumerate(self.resultsList):
+                self.progressBars.append(tqdm(desc=progressString(sharedResults, len(pairings) > 1), total=settings.games, initial=sharedResults.gameAmount(), position=pairingNr, dynamic_ncols=True, unit="games"))
+
+    # Get opening of a game pair, None without book
+    # The last opening is kept, since the games of a pair are handed out one after another in all matches
+    def opening(self, openingNr: int) -> Opening:
+        if openingNr == None:
+            return None
+
+        lastOpeningNr, lastOpening = self.lastOpening
+        if lastOpeningNr != openingNr:
+            lastOpening = self.settings.openingBook.opening(openingNr)
+            self.lastOpening = (openingNr, lastOpening)
+        return lastOpening
+
+    # Get games that aren't finished yet as (pairing number, game number, opening), reading their openings only when they're handed out
+    # Games of stopped matches are skipped without reading their openings
+    def openedInputs(self) -> Iterator:
+        for pairingNr, gameNr, openingNr in self.inputs:
+            if not self.resultsList[pairingNr].wasStopped():
+                yield pairingNr, gameNr, self.opening(openingNr)
+
+    # Count a cached game as a finished game of the current run, without adding it to the cache again
+    def reuseGame(self, pairingNr: int, record: GameRecord, gameNr: int, fen: str, openingMoves: list) -> None:
+        record.gameNr = gameNr
+        record.fen = fen
+        record.openingMoves = openingMoves
+        self.resultsList[pairingNr].addRecord(record)
+        self.resultsList[pairingNr].addPairGame(record)
+        self.settings.store.recordGame(self.runIds[pairingNr], record)
+
+    # Handle a finished game of a match, which is already counted in its results except for its game pair
+    def recordGame(self, pairingNr: int, record: GameRecord) -> None:
+        sharedResults = self.resultsList[pairingNr]
+        sharedResults.addPairGame(record)
+        self.metrics.finishGame(pairingNr, record)
+
+        if not self.settings.suppressOutput:
+            # Update score after completed match
+            self.progressBars[pairingNr].set_description(progressString(sharedResults, len(self.pairings) > 1))
+            self.progressBars[pairingNr].update(1)
+
+        # Record finished game, so the match can be resumed and its game reused by later matches
+        if self.settings.store:
+            self.settings.store.recordGame(self.runIds[pairingNr], record)
+            self.settings.store.cacheGame(self.cacheKeys[pairingNr], record)
+
+        # Stream finished game to PGN file
+        if self.settings.pgnWriter:
+            self.settings.pgnWriter.writeGame(record, self.pairings[pairingNr], self.settings.timeControl)
+
+        # Append finished game to the archive, both games of a pair share an opening
+        if self.settings.archiveWriter:
+            self.settings.archiveWriter.writeGame(record, self.pairings[pairingNr], self.settings.timeControl, self.settings.openingBook.openingIndex(record.gameNr // 2) if self.settings.openingBook else -1)
+
+        # Collect timings of the game
+        self.timingStatsList[pairingNr].addGame(record.timing)
+        if self.settings.timingLog:
+            self.settings.timingLog.writeGame(matchName(self.pairings[pairingNr]), record.gameNr, record.timing)
+
+        # Stop remaining games of the match as soon as the SPRT accepts a hypothesis
+        if self.settings.sprt and sharedResults.sprtResult() != None:
+            sharedResults.stopMatch()
+
+    # Output error of a game
+    def reportError(self, pairingNr: int, error: str) -> None:
+        self.metrics.failGame(pairingNr)
+
+        if not self.settings.suppressOutput:
+            # Output error after one is encountered
+            self.progressBars[pairingNr].write(error)
+
+    # Stop all matches
+    def stopMatches(self) -> None:
+        for sharedResults in self.resultsList:
+            sharedResults.stopMatch()
+
+    # Close output and return pure results with the timings of the games
+    def finish(self) -> list:
+        if self.metricsServer:
+            self.metricsServer.close()
+
+        if not self.settings.suppressOutput:
+            # Cleanup
+            for progressBar in self.progressBars:
+                progressBar.close()
+            print()
+
+        resultsList = [sharedResults.toResults() for sharedResults in self.resultsList]
+        for engines, results, timingStats in zip(self.pairings, resultsList, self.timingStatsList):
+            results.timingStats = timingStats
+            if self.settings.timingLog:
+                self.settings.timingLog.writeMatch(matchName(engines), timingStats)
+        return resultsList
+
+# Create name of a match between two engines
+def matchName(engines: list) -> str:
+    return f"{engines[0].fullName()} vs {engines[1].fullName()}"
+
+# Create progress bar description out of current results, with engine names if there are multiple matches
+def progressString(results: Results, withNames: bool = False) -> str:
+    description = f"Score: {results.scoreString()}"
+    if results.sprt:
+        description += f", LLR: {results.llr()}"
+    if withNames:
+        description = f"{results.engine1.fullName()} vs {results.engine2.fullName()}: " + description
+    return description
+
+# Get engine pool of the current worker process, creating it for the first game
+def getEnginePool() -> EnginePool:
+    global workerEnginePool
+    if workerEnginePool == None:
+        workerEnginePool = EnginePool(WORKER_IDLE_PROCESSES)
+
+        # Close engine processes when the worker process exits
+        Finalize(workerEnginePool, workerEnginePool.close, exitpriority=10)
+
+    return workerEnginePool
+
+# Set up a newly created child process
+def initWorker(resultsList: list, coreScheduler: CoreScheduler = None, slotCounter: Value = None) -> None:
+    global workerResults
+    workerResults = resultsList
+
+    # Pin process to the cores of its own game slot, the engine processes it starts inherit them
+    if coreScheduler:
+        with slotCounter.get_lock():
+            slot = slotCounter.value
+            slotCounter.value += 1
+        pinProcess(os.getpid(), coreScheduler.slotCores(slot))
+
     # Ignore keyboard interrupts as they are handled by the main process
     signal.signal(signal.SIGINT, signal.SIG_IGN)
 
+    # Kill engine processes when the pool is terminated, which aborts the running games
+    signal.signal(signal.SIGTERM, terminateWorker)
+
+# Kill engine processes of a terminated child process and exit right away
+def terminateWorker(sig: int, frame: FrameInfo) -> None:
+    if workerEnginePool != None:
+        workerEnginePool.kill()
+    os._exit(1)
+
+# Play an engine game of a match in a child process with the match's shared results
+def playWorkerGame(gameInput: tuple) -> None:
+    pairingNr, gameNr, opening = gameInput
+    engineGame(gameNr, opening, workerResults[pairingNr])
+
+# Play a single game in a child process on its engine pool
+# Returns its record or the error it failed with, and the crashes and timeouts of its engines
+def playPoolGame(engines: list, timeControl: TimeControl, gameNr: int, opening: Opening, adjudication: Adjudication = None, recordMoveInfo: bool = False, moveGrace: float = MOVE_GRACE, retries: int = 0) -> tuple:
+    faultCounts = [0, 0]
     try:
-        # Create processes from engines
-        engineProcesses = [results.engine1.createProcess(), results.engine2.createProcess()]
-
-        # Set up new match
-        board = chess.Board()
-        game = []
-        matchTime = MatchTime(results.timeControl)
-        gameResult = None
-        
-        # Play chess moves until the game ends or child process is aborted
-        while (gameResult == None) and not results.wasStopped():
-            # Check which engine's move it is
-            moveTurn = board.turn
-            engineNr = whiteEngine if moveTurn == chess.WHITE else not whiteEngine
-            
-            try:
-                # Get the engine's move choice with the given time limit
-                limit = matchTime.matchLimit()
-                matchTime.start()
-                moveResult = engineProcesses[engineNr].play(board, limit)
-                matchTime.stop(moveTurn)
-            except chess.engine.EngineError as e:
-                # Handle engine errors by passing on a string of played moves to the error
-                engineName = results.engine1.fullName() if engineNr == 0 else results.engine2.fullName()
-                gameString = " ".join(game)
-                raise chess.engine.EngineError(f"Engine error occured in engine '{engineName}' after moves: playing the moves '{gameString}'") from e
-                
-            # Play move on the board
-            board.push(moveResult.move)
-            game.append(moveResult.move.uci())
-
-            gameResult = board.outcome(claim_draw=True)
-
-            # Check if the engine flagged
-            if matchTime.flagged():
-                gameResult = chess.Outcome(chess.Termination(chess.Termination.VARIANT_LOSS), not moveTurn)
-
-        # Close engines upon abortion
-        if results.wasStopped():
-            for engineProcess in engineProcesses:
-                engineProcess.close()
+        record = singleGame(engines, timeControl, gameNr, opening, getEnginePool(), adjudication, recordMoveInfo, moveGrace, retries, faultCounts)
+        return record, None, *faultCounts
+    except Exception:
+        return None, traceback.format_exc(), *faultCounts
+
+# Play an engine game, starting from the standard position if there is no opening
+def engineGame(gameNr: int, opening: Opening, results: SharedResults) -> None:
+    # Skip games of stopped matches without starting engines
+    if results.wasStopped():
+        return
+
+    engines = [results.engine1, results.engine2]
+    enginePool = getEnginePool()
+    results.putEvent(StartedEvent(str(os.getpid())))
+
+    # Replay the game from the start with restarted engines if an engine crashed or timed out, as often as retries are left
+    for attempt in range(results.retries + 1):
+        engineProcesses = []
+        try:
+            # Get live processes of the engines, they're told about the new game with ucinewgame
+            engineProcesses = [enginePool.acquire(engine) for engine in engines]
+
+            # Set up new match
+            game = Game(gameNr, opening, results.timeControl, results.adjudication, results.recordMoveInfo, results.moveGrace)
+
+            # Play chess moves until the game ends or child process is aborted
+            playMoves(game, engines, engineProcesses, enginePool, results)
+
+            # Change results based on who won (or draw), unless the match was aborted
+            if not results.wasStopped():
+                game.recordResult(results)
             return
 
-        # Check which color won
-        winnerColor = gameResult.winner
+        # Send errors of the last attempt to main process
+        except chess.engine.EngineError:
+            if attempt == results.retries or results.wasStopped():
+                results.putEvent(ErrorEvent(traceback.format_exc()))
+                return
 
-        # Change results based on who won (or draw)
-        if winnerColor == None:
-            results.addDraws(1)
-        else:
-            if winnerColor == chess.WHITE:
-                winnerEngine = whiteEngine
-            else:
-                winnerEngine = not whiteEngine
+        # Send all other errors to main process
+        except Exception:
+            results.putEvent(ErrorEvent(traceback.format_exc()))
+            return
 
-            if winnerEngine == 0:
-                results.addEngine1Wins(1)
-            else:
-                results.addEngine2Wins(1)
+        # Return engines to pool (important)
+        finally:
+            releaseEngineProcesses(engines, engineProcesses, enginePool)
 
-        # Pass on that the event was completed
-        results.putEvent(MatchEvent())
+# Play chess moves of a game until it ends or its match is aborted
+# Engines that crash or don't answer within their time and the grace time are killed, raising an engine error
+def playMoves(game: Game, engines: list, engineProcesses: list, enginePool: EnginePool, results: SharedResults = None) -> None:
+    while not game.isOver() and not (results and results.wasStopped()):
+        # Check which engine's move it is
+        engineNr = game.engineToMove()
 
-    # Send all errors to main process
-    except Exception:
-        results.putEvent(ErrorEvent(traceback.format_exc()))
+        try:
+            # Get the engine's move choice with the given time limit
+            limit = game.startMove()
+            moveResult = playWatched(engineProcesses[engineNr], game, limit)
+        except (chess.engine.EngineError, asyncio.TimeoutError) as e:
+            # Kill engine that crashed or timed out, it's restarted for the next game
+            enginePool.discard(engineProcesses[engineNr])
+            engineProcesses[engineNr] = None
+            if results:
+                results.addEngineFault(isinstance(e, asyncio.TimeoutError))
+                results.putEvent(RestartEvent(str(os.getpid())))
+
+            # Handle engine errors by passing on a string of played moves to the error
+            raise game.engineError(engines[engineNr]) from e
+
+        # Play move on the board
+        game.finishMove(moveResult)
+
+# Get the move of an engine process, giving up after the move's timeout
+# Like SimpleEngine.play, but clock limits are watched as well
+def playWatched(engineProcess: chess.engine.SimpleEngine, game: Game, limit: chess.engine.Limit) -> chess.engine.PlayResult:
+    # Event loop of the process is closed once it exited
+    if engineProcess.returncode.done():
+        raise chess.engine.EngineTerminatedError("engine process died unexpectedly")
+
+    coroutine = asyncio.wait_for(engineProcess.protocol.play(game.board, limit, game=game.gameId, info=game.info), game.moveTimeout(limit))
+    return asyncio.run_coroutine_threadsafe(coroutine, engineProcess.protocol.loop).result()
+
+# Play a single game in the current process without a pool of processes, the engine processes are kept if a pool is given
+# The game is replayed as often as retries are left if an engine crashed or timed out, these faults are counted in faultCounts ([crashes, timeouts]) if it's given
+def singleGame(engines: list, timeControl: TimeControl, gameNr: int = 0, opening: Opening = None, enginePool: EnginePool = None, adjudication: Adjudication = None, recordMoveInfo: bool = False, moveGrace: float = MOVE_GRACE, retries: int = 0, faultCounts: list = None) -> GameRecord:
+    ownPool = enginePool == None
+    if ownPool:
+        enginePool = EnginePool()
+
+    try:
+        for attempt in range(retries + 1):
+            engineProcesses = []
+            try:
+                # Get live processes of the engines and play the game
+                engineProcesses = [enginePool.acquire(engine) for engine in engines]
+                game = Game(gameNr, opening, timeControl, adjudication, recordMoveInfo, moveGrace)
+                playMoves(game, engines, engineProcesses, enginePool)
+                return game.record()
+            except chess.engine.EngineError as e:
+                # Errors of engines during the game are raised from the crash or timeout, unlike errors when starting them
+                if faultCounts != None and isinstance(e.__cause__, (chess.engine.EngineError, asyncio.TimeoutError)):
+                    faultCounts[1 if isinstance(e.__cause__, asyncio.TimeoutError) else 0] += 1
+                if attempt == retries:
+                    raise
+            finally:
+                # Return engines to pool
+                releaseEngineProcesses(engines, engineProcesses, enginePool)
+    finally:
+        # Close engines if the pool is only used for this game
+        if ownPool:
+            enginePool.close()
 
-    # Close engines (important)
-    for engineProcess in engineProcesses:
-        engineProcess.close()
\ No newline at end of file
+# Return the engine processes of a game that are still alive to the pool
+def releaseEngineProcesses(engines: list, engineProcesses: list, enginePool: EnginePool) -> None:
+    for engine, engineProcess in zip(engines, engineProcesses):
+        if engineProcess != None:
+            enginePool.release(engine, engineProcess)
\ No newline at end of file
@@ -0,0 +1,166 @@
+from __future__ import annotations
+import os, signal, threading
+import chess, chess.engine
+from src.Engine import Engine
+
+# Kill an engine process together with the processes it started, engines run in their own process group
+# Only kills the engine process itself on platforms without process groups
+def killProcessGroup(transport) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(transport.get_pid(), signal.SIGKILL)
+        else:
+            transport.kill()
+    except OSError:
+        # Processes are already gone
+        pass
+
+# Class for keeping engine processes alive between the games of one worker process
+# Only the most recently used processes are kept if there's a limit, since every engine keeps its hash in memory
+class EnginePool:
+    idleProcesses: dict # Idle engine processes by engine command and options, ordered by last use
+    liveProcesses: set # Processes started by the pool that aren't closed yet, idle or in a game
+    maxIdleProcesses: int # Maximum number of idle processes, the least recently used are closed (None for no limit)
+
+    # Create empty pool
+    def __init__(self, maxIdleProcesses: int = None):
+        self.idleProcesses = {}
+        self.liveProcesses = set()
+        self.maxIdleProcesses = maxIdleProcesses
+
+    # Get a live process of an engine, only starting a new one if no idle process is left
+    def acquire(self, engine: Engine) -> chess.engine.SimpleEngine:
+        process = self.takeIdleProcess(engine)
+        if process == None:
+            process = self.startProcess(engine)
+        return process
+
+    # Start a new process of an engine
+    def startProcess(self, engine: Engine) -> chess.engine.SimpleEngine:
+        process = engine.createProcess()
+        self.liveProcesses.add(process)
+        return process
+
+    # Close a process that isn't used anymore
+    def closeProcess(self, process: chess.engine.SimpleEngine) -> None:
+        self.liveProcesses.discard(process)
+        process.close()
+
+    # Take a live idle process of an engine out of the pool, if there is one
+    def takeIdleProcess(self, engine: Engine) -> chess.engine.SimpleEngine:
+        idleProcesses = self.idleProcesses.get(engine.processKey(), [])
+        while idleProcesses:
+            process = idleProcesses.pop()
+
+            # Skip processes that have exited since their last game
+            if process.returncode.done():
+                self.closeProcess(process)
+            else:
+                return process
+
+        return None
+
+    # Give a process back to the pool after a game, so it can be reused for the next one
+    def release(self, engine: Engine, process: chess.engine.SimpleEngine) -> None:
+        for evictedProcess in self.addIdleProcess(engine, process):
+            self.closeProcess(evictedProcess)
+
+    # Add an idle process, returning the least recently used processes that are too many
+    def addIdleProcess(self, engine: Engine, process: chess.engine.SimpleEngine) -> list:
+        # Move engine to the end, so the dictionary is ordered by last use
+        idleProcesses = self.idleProcesses.pop(engine.processKey(), [])
+        idleProcesses.append(process)
+        self.idleProcesses[engine.processKey()] = idleProcesses
+
+        evictedProcesses = []
+        if self.maxIdleProcesses != None:
+            while sum(len(processes) for processes in self.idleProcesses.values()) > self.maxIdleProcesses:
+                oldestKey = next(iter(self.idleProcesses))
+                evictedProcesses.append(self.idleProcesses[oldestKey].pop(0))
+                if not self.idleProcesses[oldestKey]:
+                    del self.idleProcesses[oldestKey]
+        return evictedProcesses
+
+    # Get rid of a process that crashed or timed out, so it's restarted for the next game
+    # It's killed right away, since a hung engine doesn't react to quit
+    def discard(self, process: chess.engine.SimpleEngine) -> None:
+        try:
+            process.protocol.loop.call_soon_threadsafe(killProcessGroup, process.transport)
+        except RuntimeError:
+            # Event loop of the process is already closed, because it exited
+            pass
+        self.closeProcess(process)
+
+    # Close all idle processes (important)
+    def close(self) -> None:
+        for idleProcesses in self.idleProcesses.values():
+            for process in idleProcesses:
+                self.closeProcess(process)
+        self.idleProcesses = {}
+
+    # Kill all processes right away, including those of running games, when the process of the pool is terminated
+    def kill(self) -> None:
+        for process in list(self.liveProcesses):
+            killProcessGroup(process.transport)
+
+
+# Class for keeping engine processes alive between games that are played by multiple threads
+# Only the most recently used processes are kept, since every new engine parameter starts new processes
+class ThreadSafeEnginePool(EnginePool):
+    lock: threading.Lock
+
+    # Create empty pool
+    def __init__(self, maxIdleProcesses: int = 16):
+        super().__init__(maxIdleProcesses)
+        self.lock = threading.Lock()
+
+    # Get a live process of an engine, new processes are started outside of the lock
+    def acquire(self, engine: Engine) -> chess.engine.SimpleEngine:
+        with self.lock:
+            process = self.takeIdleProcess(engine)
+        if process == None:
+            process = self.startProcess(engine)
+        return process
+
+    # Give a process back to the pool after a game, closing the least recently used ones if there are too many
+    def release(self, engine: Engine, process: chess.engine.SimpleEngine) -> None:
+        with self.lock:
+            evictedProcesses = self.addIdleProcess(engine, process)
+        for evictedProcess in evictedProcesses:
+            self.closeProcess(evictedProcess)
+
+    # Close all idle processes (important)
+    def close(self) -> None:
+        with self.lock:
+            super().close()
+
+
+# Class for keeping engine processes alive between the games run on one event loop
+class AsyncEnginePool(EnginePool):
+    # Get a live process of an engine, only starting a new one if no idle process is left
+    async def acquire(self, engine: Engine) -> chess.engine.UciProtocol:
+        idleProcesses = self.idleProcesses.get(engine.processKey(), [])
+        while idleProcesses:
+            process = idleProcesses.pop()
+
+            # Skip processes that have exited since their last game
+            if process.returncode.done():
+                await self.discard(process)
+            else:
+                return process
+
+        return await engine.createProtocol()
+
+    # Get rid of a process that crashed or timed out, so it's restarted for the next game
+    async def discard(self, process: chess.engine.UciProtocol) -> None:
+        # Wait until the process is gone, so it's cleaned up before the event loop closes
+        killProcessGroup(process.transport)
+        process.transport.close()
+        await process.returncode
+
+    # Close all idle processes (important)
+    async def close(self) -> None:
+        for idleProcesses in self.idleProcesses.values():
+            for process in idleProcesses:
+                await self.discard(process)
+        self.idleProcesses = {}
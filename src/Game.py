@@ -0,0 +1,167 @@
+import time
+import chess, chess.engine
+from src.Engine import Engine
+from src.Results import SharedResults, MatchEvent
+from src.Openings import Opening
+from src.TimeControl import TimeControl, MatchTime, MOVE_GRACE, UNTIMED_MOVE_TIME
+from src.Adjudication import Adjudication, Adjudicator
+from src.GameRecord import GameRecord
+from src.Timing import GameTiming
+from src.GameState import GameState
+
+# Class for the state of a game between two engines, independent of how the engine processes are run
+class Game:
+    gameNr: int # Number of the game in its match
+    whiteEngine: int
+    opening: Opening
+    board: chess.Board
+    state: GameState # Detects the end of the game after every move
+    moves: list # Moves played by the engines in UCI notation
+    comments: list # Score, depth and time of every engine move, None if they aren't recorded
+    matchTime: MatchTime
+    outcome: chess.Outcome
+    gameId: object # Identifies the game to engine processes, so they're told about new games with ucinewgame
+    adjudicator: Adjudicator # None if games aren't adjudicated
+    info: chess.engine.Info # Info requested from engines with their moves
+    timing: GameTiming
+    startTime: float
+    moveEndTime: float # Time at which the last engine move was received
+    moveGrace: float # Seconds an engine gets beyond its time for a move before it's killed
+
+    # Set up new game, starting from the standard position if there is no opening
+    def __init__(self, gameNr: int, opening: Opening, timeControl: TimeControl, adjudication: Adjudication = None, recordMoveInfo: bool = False, moveGrace: float = MOVE_GRACE):
+        self.timing = GameTiming()
+        self.startTime = time.perf_counter()
+        self.moveEndTime = None
+        self.moveGrace = moveGrace
+
+        # Games alternate colors, so every opening is played with both
+        self.gameNr = gameNr
+        self.whiteEngine = gameNr % 2
+        self.opening = opening
+        self.board = opening.board() if opening else chess.Board()
+        self.state = GameState(self.board)
+        self.moves = []
+        self.comments = [] if recordMoveInfo else None
+        self.matchTime = MatchTime(timeControl, self.whiteEngine)
+        self.outcome = self.board.outcome(claim_draw=True)
+        self.gameId = object()
+
+        # Adjudication needs the scores of the engines, move comments also their depths
+        self.adjudicator = Adjudicator(adjudication) if adjudication and adjudication.isEnabled() else None
+        self.info = chess.engine.INFO_NONE
+        if self.adjudicator:
+            self.info |= chess.engine.INFO_SCORE
+        if recordMoveInfo:
+            self.info |= chess.engine.INFO_BASIC | chess.engine.INFO_SCORE
+
+    # Check if the game has ended
+    def isOver(self) -> bool:
+        return self.outcome != None
+
+    # Check which engine's move it is
+    def engineToMove(self) -> int:
+        return self.whiteEngine if self.board.turn == chess.WHITE else int(not self.whiteEngine)
+
+    # Start clock of the engine to move, return its time limit
+    def startMove(self) -> chess.engine.Limit:
+        limit = self.matchTime.matchLimit(self.board.turn)
+        self.matchTime.start()
+
+        # Time since the last engine move was spent by the harness
+        if self.moveEndTime != None:
+            self.timing.overheadTimes.append(self.matchTime.startTime - self.moveEndTime)
+
+        return limit
+
+    # Get time after which the engine to move is killed: the least of its time for the move and its clock, plus the grace time
+    # Moves without a time limit (only nodes or depth) get a fixed time, so hung engines are killed as well
+    def moveTimeout(self, limit: chess.engine.Limit) -> float:
+        moveTimes = []
+        if limit.time != None:
+            moveTimes.append(limit.time)
+        if limit.white_clock != None:
+            if self.board.turn == chess.WHITE:
+                moveTimes.append(limit.white_clock + (limit.white_inc or 0))
+            else:
+                moveTimes.append(limit.black_clock + (limit.black_inc or 0))
+
+        if not moveTimes:
+            moveTimes.append(UNTIMED_MOVE_TIME)
+        return max(min(moveTimes), 0) + self.moveGrace
+
+    # Stop clock and play the engine's move on the board
+    def finishMove(self, moveResult: chess.engine.PlayResult) -> None:
+        moveTurn = self.board.turn
+        timePassed = self.matchTime.stop(moveTurn)
+        self.moveEndTime = time.perf_counter()
+        self.timing.thinkTimes.append(timePassed)
+
+        # Play move on the board, checking incrementally if the game ended
+        self.outcome = self.state.push(self.board, moveResult.move)
+        self.moves.append(moveResult.move.uci())
+
+        if self.comments != None:
+            self.comments.append(moveComment(moveResult.info, timePassed))
+
+        # Check if the engine flagged
+        if self.matchTime.flagged():
+            self.outcome = chess.Outcome(chess.Termination(chess.Termination.VARIANT_LOSS), not moveTurn)
+            self.timing.flagTimeLeft = self.matchTime.timeLeft(moveTurn)
+
+        # Check if the game can be adjudicated with the reported score
+        if self.outcome == None and self.adjudicator:
+            self.outcome = self.adjudicator.update(self.board, moveResult.info.get("score"))
+
+    # Check if the game was ended by adjudication
+    def wasAdjudicated(self) -> bool:
+        return self.adjudicator != None and self.adjudicator.reason != None
+
+    # Create error for an engine failing in this game, passing on a string of played moves
+    def engineError(self, engine: Engine) -> chess.engine.EngineError:
+        gameString = " ".join(self.moves)
+        return chess.engine.EngineError(f"Engine error occured in engine '{engine.fullName()}' after moves: playing the moves '{gameString}'")
+
+    # Change results based on who won (or draw) and pass on that the game was completed
+    def recordResult(self, results: SharedResults) -> None:
+        record = self.record()
+        results.addRecord(record)
+        results.putEvent(MatchEvent(record))
+
+    # Create record of the finished game
+    def record(self) -> GameRecord:
+        if self.wasAdjudicated():
+            termination = "adjudication"
+            reason = self.adjudicator.reason
+        elif self.outcome.termination == chess.Termination.VARIANT_LOSS:
+            termination = "time forfeit"
+            reason = "flag"
+        else:
+            termination = "normal"
+            reason = self.outcome.termination.name.lower()
+
+        # Time after the last engine move was also spent by the harness
+        now = time.perf_counter()
+        if self.moveEndTime != None:
+            self.timing.overheadTimes.append(now - self.moveEndTime)
+        self.timing.duration = now - self.startTime
+
+        fen = self.opening.fen if self.opening else chess.STARTING_FEN
+        openingMoves = self.opening.moves if self.opening else []
+        return GameRecord(self.gameNr, self.whiteEngine, fen, openingMoves, self.moves, self.comments, self.outcome.result(), termination, reason, self.timing)
+
+# Create comment for an engine move out of its info, like "+0.25/12 0.101s"
+def moveComment(info: dict, timePassed: float) -> str:
+    comment = f"{round(timePassed, 3)}s"
+
+    if "depth" in info:
+        comment = f"/{info['depth']} " + comment
+    if "score" in info:
+        score = info["score"].relative
+        if score.is_mate():
+            scoreString = ("+" if score.mate() > 0 else "-") + "M" + str(abs(score.mate()))
+        else:
+            scoreString = ("+" if score.score() >= 0 else "") + f"{score.score() / 100:.2f}"
+        comment = scoreString + comment
+
+    return comment.strip()
@@ -0,0 +1,23 @@
+import os, sys, json, socket
+
+# Get default path of the socket that the game daemon listens on, next to the executable
+def defaultSocketPath() -> str:
+    return os.path.dirname(os.path.abspath(sys.argv[0])) + "/share/QuintTest.sock"
+
+# Let a running game daemon play a game, returns None if no daemon is running
+def requestGame(engines: list, timeControl: str, gameNr: int = 0, socketPath: str = None) -> dict:
+    try:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socketPath or defaultSocketPath())
+    except (AttributeError, OSError):
+        # Unix sockets aren't supported or no daemon is listening
+        return None
+
+    with connection, connection.makefile("rwb") as stream:
+        stream.write((json.dumps({"engines": engines, "timeControl": timeControl, "gameNr": gameNr}) + "\n").encode())
+        stream.flush()
+        reply = json.loads(stream.readline())
+
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply
@@ -0,0 +1,61 @@
+from __future__ import annotations
+import os, json, socketserver, traceback
+from src.Engine import Engine
+from src.EnginePool import ThreadSafeEnginePool
+from src.TimeControl import TimeControl
+from src.EngineMatch import singleGame
+from src.GameClient import defaultSocketPath
+
+# Class for handling connections to the daemon, every line of a connection requests one game
+# Request: {"engines": [[name, params], [name, params]], "timeControl": "=0.1", "gameNr": 0}
+# Reply: {"result": "1-0", "winnerEngine": 0} or {"error": "..."}, the first engine plays white in even games
+class GameRequestHandler(socketserver.StreamRequestHandler):
+    server: GameDaemon
+
+    # Play the requested games one after another
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                engines = [Engine(name, params) for name, params in request["engines"]]
+                record = singleGame(engines, TimeControl(request["timeControl"]), request.get("gameNr", 0), enginePool=self.server.enginePool)
+                reply = {"result": record.result, "winnerEngine": record.winnerEngine()}
+            except Exception:
+                reply = {"error": traceback.format_exc()}
+
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+            self.wfile.flush()
+
+# Class for a long-lived local server that plays single games on warm engine processes
+class GameDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    enginePool: ThreadSafeEnginePool
+
+    # Create daemon listening on a Unix socket, replacing a socket that was left behind
+    def __init__(self, socketPath: str):
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+        os.makedirs(os.path.dirname(os.path.abspath(socketPath)), exist_ok=True)
+
+        self.enginePool = ThreadSafeEnginePool()
+        super().__init__(socketPath, GameRequestHandler)
+
+    # Stop listening and close engine processes (important)
+    def server_close(self) -> None:
+        super().server_close()
+        self.enginePool.close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+# Run daemon until keyboard interrupt
+def serveGames(socketPath: str = None) -> None:
+    socketPath = socketPath or defaultSocketPath()
+    with GameDaemon(socketPath) as daemon:
+        print(f"Playing games for connections on {socketPath}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
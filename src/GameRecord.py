@@ -0,0 +1,51 @@
+from src.Timing import GameTiming
+
+# Class for the record of a finished game, sent from the game to the main process
+class GameRecord:
+    gameNr: int # Number of the game in its match
+    whiteEngine: int
+    fen: str # Start position of the game
+    openingMoves: list # Moves of the opening in UCI notation
+    moves: list # Moves played by the engines in UCI notation
+    comments: list # Score, depth and time of every engine move, None if they weren't recorded
+    result: str # Result in PGN notation ("1-0", "0-1" or "1/2-1/2")
+    termination: str # PGN termination ("normal", "time forfeit" or "adjudication")
+    reason: str # Exact reason for the end of the game ("checkmate", "resign", ...)
+    timing: GameTiming # None for games read from a store
+
+    def __init__(self, gameNr: int, whiteEngine: int, fen: str, openingMoves: list, moves: list, comments: list, result: str, termination: str, reason: str, timing: GameTiming = None):
+        self.gameNr = gameNr
+        self.whiteEngine = whiteEngine
+        self.fen = fen
+        self.openingMoves = openingMoves
+        self.moves = moves
+        self.comments = comments
+        self.result = result
+        self.termination = termination
+        self.reason = reason
+        self.timing = timing
+
+    # Convert to dictionary for sending over the network
+    def toDict(self) -> dict:
+        data = {name: getattr(self, name) for name in ["gameNr", "whiteEngine", "fen", "openingMoves", "moves", "comments", "result", "termination", "reason"]}
+        data["timing"] = self.timing.toDict() if self.timing else None
+        return data
+
+    # Create record from a dictionary
+    @classmethod
+    def fromDict(cls, data: dict):
+        timing = GameTiming.fromDict(data["timing"]) if data["timing"] else None
+        return cls(data["gameNr"], data["whiteEngine"], data["fen"], data["openingMoves"], data["moves"], data["comments"], data["result"], data["termination"], data["reason"], timing)
+
+    # Get engine that won the game (0 or 1), None if it was drawn
+    def winnerEngine(self) -> int:
+        if self.result == "1-0":
+            return self.whiteEngine
+        elif self.result == "0-1":
+            return 1 - self.whiteEngine
+        else:
+            return None
+
+    # Check if the game was ended by adjudication
+    def wasAdjudicated(self) -> bool:
+        return self.termination == "adjudication"
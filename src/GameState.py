@@ -0,0 +1,93 @@
+import chess, chess.polyglot
+
+# Hasher for the parts of a position that aren't piece placement
+hasher = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+# Class for detecting the end of a game incrementally, instead of checking the whole move stack after every move
+class GameState:
+    placementKey: int # Zobrist key of the piece placement, updated with the squares changed by every move
+    repetitions: dict # Number of occurrences of every position since the last capture or pawn move, by Zobrist key
+    repeated: bool # Whether a position occurred twice since the last capture or pawn move
+
+    # Set up state of a board, including the moves that led to it
+    def __init__(self, board: chess.Board):
+        replayBoard = board.root()
+        self.placementKey = hasher.hash_board(replayBoard)
+        self.repetitions = {self.positionKey(replayBoard): 1}
+        self.repeated = False
+
+        for move in board.move_stack:
+            self.push(replayBoard, move)
+
+    # Get Zobrist key of the position on a board
+    def positionKey(self, board: chess.Board) -> int:
+        return self.placementKey ^ hasher.hash_castling(board) ^ hasher.hash_ep_square(board) ^ hasher.hash_turn(board)
+
+    # Play a move on a board, return the outcome of the game if it ended (claiming draws)
+    def push(self, board: chess.Board, move: chess.Move) -> chess.Outcome:
+        # Find squares whose pieces are changed by the move
+        changedSquares = [move.from_square, move.to_square]
+        if board.is_castling(move):
+            changedSquares = chess.SquareSet(chess.BB_RANKS[chess.square_rank(move.from_square)])
+        elif board.is_en_passant(move):
+            changedSquares.append(chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
+        materialChanged = board.is_capture(move) or move.promotion != None
+
+        # Update placement key with the pieces before and after the move
+        self.placementKey ^= self.placementHash(board, changedSquares)
+        board.push(move)
+        self.placementKey ^= self.placementHash(board, changedSquares)
+
+        # Positions before a capture or pawn move can't be repeated
+        if board.halfmove_clock == 0:
+            self.repetitions = {}
+            self.repeated = False
+        positionKey = self.positionKey(board)
+        self.repetitions[positionKey] = self.repetitions.get(positionKey, 0) + 1
+        if self.repetitions[positionKey] >= 2:
+            self.repeated = True
+
+        # Only generate moves until the first legal one is found
+        if not any(board.generate_legal_moves()):
+            if board.is_check():
+                return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+            else:
+                return chess.Outcome(chess.Termination.STALEMATE, None)
+
+        # Material can only become insufficient after captures and promotions
+        if materialChanged and board.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+
+        # Draws can also be claimed with a move reaching 50 moves, like with chess.Board.outcome
+        if board.halfmove_clock >= 100 or (board.halfmove_clock >= 99 and any(not board.is_zeroing(legalMove) for legalMove in board.generate_legal_moves())):
+            return chess.Outcome(chess.Termination.FIFTY_MOVES, None)
+
+        # Same for a move repeating a position for the third time, only possible if a position was repeated already
+        if self.repetitions[positionKey] >= 3 or (self.repeated and self.canClaimRepetition(board)):
+            return chess.Outcome(chess.Termination.THREEFOLD_REPETITION, None)
+
+        return None
+
+    # Check if a legal move leads to a position that occurred twice already
+    def canClaimRepetition(self, board: chess.Board) -> bool:
+        for legalMove in board.generate_legal_moves():
+            if board.is_zeroing(legalMove):
+                continue
+
+            board.push(legalMove)
+            positionKey = chess.polyglot.zobrist_hash(board)
+            board.pop()
+
+            if self.repetitions.get(positionKey, 0) >= 2:
+                return True
+
+        return False
+
+    # Get Zobrist hash of the pieces on some squares
+    def placementHash(self, board: chess.Board, squares: list) -> int:
+        placementHash = 0
+        for square in squares:
+            piece = board.piece_at(square)
+            if piece:
+                placementHash ^= chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * ((piece.piece_type - 1) * 2 + int(piece.color)) + square]
+        return placementHash
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from src.TimeControl import TimeControl, MOVE_GRACE
+from src.SPRT import SPRT
+from src.Openings import OpeningBook
+from src.Adjudication import Adjudication
+from src.PGN import PGNWriter
+from src.Archive import ArchiveWriter
+from src.ResultStore import ResultStore
+from src.Timing import TimingLog
+
+# Class for the settings that all matches of a test are played with, created once and passed down to where the games are played
+@dataclass
+class MatchSettings:
+    games: int # Number of games per match, the maximum with SPRT
+    timeControl: TimeControl
+    processes: int = 1 # Number of games simultaneously, only for local matches
+    suppressOutput: bool = False
+    sprt: SPRT = None
+    openingBook: OpeningBook = None
+    backend: str = "process" # Run every game in its own process ("process") or all games on one event loop ("asyncio")
+    adjudication: Adjudication = None
+    pgnWriter: PGNWriter = None
+    recordMoveInfo: bool = False
+    store: ResultStore = None
+    resume: bool = False
+    timingLog: TimingLog = None
+    affinity: bool = False # Pin the engines of every game to dedicated cores, only for local matches
+    archiveWriter: ArchiveWriter = None
+    topUp: bool = False
+    metricsAddress: tuple = None
+    moveGrace: float = MOVE_GRACE
+    retries: int = 0
+    batchSize: int = None # Number of games handed to a worker at once, only for served matches
@@ -0,0 +1,179 @@
+from __future__ import annotations
+import json, math, time, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.Results import SharedResults
+from src.GameRecord import GameRecord
+
+# Class for the live metrics of one match, collected from the events of its games by the main process
+class MatchMetrics:
+    results: SharedResults
+    name: str
+    gamesPlayed: int # Games finished in this run, without resumed or cached games
+    activeGames: int
+    plies: int # Plies of the games finished in this run
+    flags: int # Games lost on time
+    failedGames: int # Games that failed, because an engine crashed or timed out in their last attempt
+    restarts: dict # Engine restarts after crashes or timeouts by worker
+
+    def __init__(self, results: SharedResults, name: str):
+        self.results = results
+        self.name = name
+        self.gamesPlayed = 0
+        self.activeGames = 0
+        self.plies = 0
+        self.flags = 0
+        self.failedGames = 0
+        self.restarts = {}
+
+# Class for collecting live metrics of running matches and converting them to Prometheus text or JSON
+class Metrics:
+    matches: list
+    startTime: float
+    lock: threading.Lock # Metrics are updated by the main thread and read by the server threads
+
+    def __init__(self, resultsList: list, names: list):
+        self.matches = [MatchMetrics(results, name) for results, name in zip(resultsList, names)]
+        self.startTime = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Update metrics with the events of a match
+    def startGame(self, pairingNr: int) -> None:
+        with self.lock:
+            self.matches[pairingNr].activeGames += 1
+
+    def finishGame(self, pairingNr: int, record: GameRecord) -> None:
+        with self.lock:
+            match = self.matches[pairingNr]
+            match.activeGames = max(match.activeGames - 1, 0)
+            match.gamesPlayed += 1
+            match.plies += len(record.moves)
+            if record.termination == "time forfeit":
+                match.flags += 1
+
+    def failGame(self, pairingNr: int) -> None:
+        with self.lock:
+            match = self.matches[pairingNr]
+            match.activeGames = max(match.activeGames - 1, 0)
+            match.failedGames += 1
+
+    def restartEngine(self, pairingNr: int, worker: str) -> None:
+        with self.lock:
+            restarts = self.matches[pairingNr].restarts
+            restarts[worker] = restarts.get(worker, 0) + 1
+
+    # Get current metrics of all matches as dictionaries
+    def snapshot(self) -> list:
+        with self.lock:
+            elapsed = time.monotonic() - self.startTime
+            snapshot = []
+            for match in self.matches:
+                results = match.results
+                summary = results.summary()
+                snapshot.append({
+                    "match": match.name,
+                    "wins": results.getEngine1Wins(),
+                    "losses": results.getEngine2Wins(),
+                    "draws": results.getDraws(),
+                    "elo": summary["elo"],
+                    "eloLower": summary["eloLower"],
+                    "eloUpper": summary["eloUpper"],
+                    "gamesPlayed": match.gamesPlayed,
+                    "gamesPerSecond": match.gamesPlayed / elapsed if elapsed > 0 else 0.0,
+                    # Games of stopped matches are aborted without finishing
+                    "activeGames": 0 if results.wasStopped() else match.activeGames,
+                    "averagePlies": match.plies / match.gamesPlayed if match.gamesPlayed else float("nan"),
+                    "flags": match.flags,
+                    "crashes": results.getCrashes(),
+                    "timeouts": results.getTimeouts(),
+                    "failedGames": match.failedGames,
+                    "restarts": dict(match.restarts),
+                    "stopped": results.wasStopped()
+                })
+            return snapshot
+
+    # Convert metrics to JSON, NaN values (like the elo before the first game) become null
+    def toJson(self) -> str:
+        snapshot = [{name: None if isinstance(value, float) and math.isnan(value) else value for name, value in match.items()} for match in self.snapshot()]
+        return json.dumps({"uptime": time.monotonic() - self.startTime, "matches": snapshot})
+
+    # Convert metrics to the Prometheus text format, every match is a label
+    # Counts that only grow are counters (with the suffix _total), values that can go down are gauges
+    def toPrometheus(self) -> str:
+        snapshot = self.snapshot()
+        metrics = [
+            ("wins", "wins_total", "counter", "Games won by engine 1"),
+            ("losses", "losses_total", "counter", "Games lost by engine 1"),
+            ("draws", "draws_total", "counter", "Drawn games"),
+            ("gamesPlayed", "games_total", "counter", "Games finished in this run"),
+            ("flags", "flags_total", "counter", "Games lost on time"),
+            ("crashes", "crashes_total", "counter", "Engines that crashed"),
+            ("timeouts", "timeouts_total", "counter", "Engines killed for not answering within their time and the grace time"),
+            ("failedGames", "failed_games_total", "counter", "Games that failed because an engine crashed or timed out in their last attempt"),
+            ("elo", "elo", "gauge", "Elo difference of engine 1"),
+            ("eloLower", "elo_lower", "gauge", "Lower end of the 95% confidence interval of the elo difference"),
+            ("eloUpper", "elo_upper", "gauge", "Upper end of the 95% confidence interval of the elo difference"),
+            ("gamesPerSecond", "games_per_second", "gauge", "Games finished per second in this run"),
+            ("activeGames", "active_games", "gauge", "Games being played"),
+            ("averagePlies", "average_plies", "gauge", "Average number of plies of the games finished in this run")
+        ]
+
+        lines = []
+        for key, name, metricType, help in metrics:
+            lines.append(f"# HELP quinttest_{name} {help}")
+            lines.append(f"# TYPE quinttest_{name} {metricType}")
+            for match in snapshot:
+                lines.append(f"quinttest_{name}{{match={labelValue(match['match'])}}} {float(match[key])}")
+
+        lines.append("# HELP quinttest_restarts_total Engines restarted after crashes or timeouts")
+        lines.append("# TYPE quinttest_restarts_total counter")
+        for match in snapshot:
+            for worker, restarts in sorted(match["restarts"].items()):
+                lines.append(f"quinttest_restarts_total{{match={labelValue(match['match'])},worker={labelValue(worker)}}} {restarts}")
+
+        return "\n".join(lines) + "\n"
+
+# Quote a label value for the Prometheus text format
+def labelValue(value: str) -> str:
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+# Class for answering metrics requests: /metrics in the Prometheus text format, /metrics.json as JSON
+class MetricsHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self.sendBody(self.server.metrics.toPrometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self.sendBody(self.server.metrics.toJson(), "application/json")
+        else:
+            self.send_error(404)
+
+    def sendBody(self, body: str, contentType: str) -> None:
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Don't write requests to the terminal, which would break the progress bars
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+# Class for the HTTP server of the metrics, which runs in a background thread during the matches
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    metrics: Metrics
+    thread: threading.Thread
+
+    def __init__(self, address: tuple, metrics: Metrics):
+        self.metrics = metrics
+        super().__init__(address, MetricsHandler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    # Stop serving and close the socket
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,75 @@
+import sys, time, random, argparse
+import chess
+
+# Fake UCI engine for measuring QuintTest itself, answers instantly (or after a set latency) with random or scripted legal moves
+# Run as a script or with the hidden mock-engine command of QuintTest, see MockEngine in src/Engine.py for using it in matches
+
+# Parse position command, only playing the new moves if the position continues the last one
+def updateBoard(board: chess.Board, moves: list, tokens: list) -> tuple:
+    if tokens[1] == "startpos":
+        fen = chess.STARTING_FEN
+        rest = tokens[2:]
+    else:
+        fen = " ".join(tokens[2:8])
+        rest = tokens[8:]
+    newMoves = rest[1:] if rest and rest[0] == "moves" else []
+
+    # Start over if the game isn't continued
+    if board.starting_fen != fen or newMoves[:len(moves)] != moves:
+        board = chess.Board(fen)
+        moves = []
+
+    for move in newMoves[len(moves):]:
+        board.push_uci(move)
+    return board, newMoves
+
+# Choose scripted move of the current ply if it's legal, otherwise a random one
+def chooseMove(board: chess.Board, plies: int, script: list) -> chess.Move:
+    if plies < len(script):
+        move = chess.Move.from_uci(script[plies])
+        if board.is_legal(move):
+            return move
+    return random.choice(list(board.legal_moves))
+
+# Answer UCI commands until quit, with the command line arguments of the fake engine (those of the script if not given)
+def main(args: list = None) -> None:
+    arger = argparse.ArgumentParser()
+    arger.add_argument("--latency", default=0.0, type=float, help="Seconds to wait before answering go")
+    arger.add_argument("--crash", default=0.0, type=float, help="Probability of exiting instead of answering go")
+    arger.add_argument("--hang", default=0.0, type=float, help="Probability of never answering go")
+    arger.add_argument("--moves", default="", type=str, help="Comma separated UCI moves that are played from the start position when legal")
+    arger.add_argument("--seed", default=None, type=int, help="Seed of the random moves")
+    options = arger.parse_args(args)
+
+    random.seed(options.seed)
+    script = [move for move in options.moves.split(",") if move]
+    board = chess.Board()
+    moves = []
+
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+
+        if tokens[0] == "uci":
+            print("id name MockEngine\nid author QuintTest\nuciok", flush=True)
+        elif tokens[0] == "isready":
+            print("readyok", flush=True)
+        elif tokens[0] == "position":
+            board, moves = updateBoard(board, moves, tokens)
+        elif tokens[0] == "go":
+            # Inject faults
+            if random.random() < options.crash:
+                sys.exit(1)
+            if random.random() < options.hang:
+                continue
+
+            if options.latency:
+                time.sleep(options.latency)
+            move = chooseMove(board, len(board.move_stack), script)
+            print(f"info depth 1 score cp 0\nbestmove {move.uci()}", flush=True)
+        elif tokens[0] == "quit":
+            break
+
+if __name__ == "__main__":
+    main()
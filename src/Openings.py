@@ -0,0 +1,109 @@
+from __future__ import annotations
+import mmap
+from array import array
+import chess, chess.pgn
+
+# Class for a start position of a game, small enough to be sent to child processes
+class Opening:
+    fen: str
+    moves: list # Moves played from the position in UCI notation
+
+    def __init__(self, fen: str, moves: list):
+        self.fen = fen
+        self.moves = moves
+
+    # Create board of the opening, keeping the moves so engines get the whole game
+    def board(self) -> chess.Board:
+        board = chess.Board(self.fen)
+        for move in self.moves:
+            board.push_uci(move)
+        return board
+
+# Class for reading openings from an EPD or PGN file, only indexing as much of the file as is used
+class OpeningBook:
+    path: str
+    isPgn: bool
+    offsets: array # File offsets of the openings indexed so far
+    scanOffset: int # File offset up to which openings have been indexed
+    indexed: bool # Whether the whole file has been indexed
+    file: object
+    data: mmap.mmap # Memory map of EPD files
+
+    # Open book, format is determined by the file extension
+    def __init__(self, path: str):
+        self.path = path
+        self.isPgn = path.lower().endswith(".pgn")
+        self.offsets = array("Q")
+        self.scanOffset = 0
+        self.indexed = False
+
+        if self.isPgn:
+            self.file = open(path, "r", encoding="utf-8-sig")
+        else:
+            self.file = open(path, "rb")
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.fileSize() > 0 else b""
+
+    # Get size of the book file in bytes
+    def fileSize(self) -> int:
+        self.file.seek(0, 2)
+        size = self.file.tell()
+        self.file.seek(0)
+        return size
+
+    # Index the next opening of the file, return False if the end was reached
+    def indexNext(self) -> bool:
+        if self.isPgn:
+            # Read headers of the next game, which skips the rest of it
+            self.file.seek(self.scanOffset)
+            if chess.pgn.read_headers(self.file) != None:
+                self.offsets.append(self.scanOffset)
+                self.scanOffset = self.file.tell()
+                return True
+        else:
+            # Find the next non-empty line
+            while self.scanOffset < len(self.data):
+                start = self.scanOffset
+                end = self.data.find(b"\n", start)
+                if end == -1:
+                    end = len(self.data)
+                self.scanOffset = end + 1
+
+                if self.data[start:end].strip():
+                    self.offsets.append(start)
+                    return True
+
+        self.indexed = True
+        return False
+
+    # Get index of the opening with the given number in the book, starting over at the beginning if the book is too short
+    def openingIndex(self, number: int) -> int:
+        while number >= len(self.offsets) and not self.indexed:
+            self.indexNext()
+
+        if not self.offsets:
+            raise ValueError(f"No openings found in '{self.path}'")
+
+        return number % len(self.offsets)
+
+    # Get opening with the given number, starting over at the beginning if the book is too short
+    def opening(self, number: int) -> Opening:
+        return self.readOpening(self.offsets[self.openingIndex(number)])
+
+    # Read opening at an offset of the file
+    def readOpening(self, offset: int) -> Opening:
+        if self.isPgn:
+            self.file.seek(offset)
+            game = chess.pgn.read_game(self.file)
+            board = game.board()
+            return Opening(board.fen(), [move.uci() for move in game.mainline_moves()])
+        else:
+            end = self.data.find(b"\n", offset)
+            line = self.data[offset:end if end != -1 else len(self.data)].decode().strip()
+            board, _ = chess.Board.from_epd(line)
+            return Opening(board.fen(), [])
+
+    # Close book file
+    def close(self) -> None:
+        if not self.isPgn and self.data:
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,85 @@
+import io, gzip, datetime
+import chess, chess.pgn
+from src.GameRecord import GameRecord
+from src.TimeControl import TimeControl
+
+# Class for streaming finished games to a PGN file, in batches and optionally compressed (.gz or .zst)
+class PGNWriter:
+    path: str
+    file: io.TextIOBase
+    buffer: list # PGN texts of games that weren't written yet
+    bufferSize: int # Number of characters in the buffer
+    maxBufferSize: int # Number of characters after which the buffer is written
+
+    # Open PGN file for appending, so multiple matches can be written to it
+    def __init__(self, path: str, maxBufferSize: int = 1 << 20):
+        self.path = path
+        self.buffer = []
+        self.bufferSize = 0
+        self.maxBufferSize = maxBufferSize
+
+        if path.endswith(".gz"):
+            self.file = gzip.open(path, "at", encoding="utf-8")
+        elif path.endswith(".zst"):
+            # Zstandard compression needs an optional package
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Writing .zst files requires the zstandard package (pip install zstandard)")
+            self.file = io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, "ab")), encoding="utf-8")
+        else:
+            self.file = open(path, "a", encoding="utf-8")
+
+    # Add finished game to the buffer, writing the buffer if it's full
+    def writeGame(self, record: GameRecord, engines: list, timeControl: TimeControl) -> None:
+        text = str(pgnGame(record, engines, timeControl)) + "\n\n"
+        self.buffer.append(text)
+        self.bufferSize += len(text)
+
+        if self.bufferSize >= self.maxBufferSize:
+            self.flush()
+
+    # Write all buffered games to the file
+    def flush(self) -> None:
+        self.file.write("".join(self.buffer))
+        self.file.flush()
+        self.buffer = []
+        self.bufferSize = 0
+
+    # Write remaining games and close file (important for compressed files)
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+# Create PGN game out of a game record
+def pgnGame(record: GameRecord, engines: list, timeControl: TimeControl) -> chess.pgn.Game:
+    game = chess.pgn.Game()
+    game.headers["Event"] = "QuintTest match"
+    game.headers["Site"] = "?"
+    game.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+    game.headers["Round"] = str(record.gameNr + 1)
+    game.headers["White"] = engines[record.whiteEngine].fullName()
+    game.headers["Black"] = engines[1 - record.whiteEngine].fullName()
+    game.headers["Result"] = record.result
+    game.headers["TimeControl"] = timeControl.toString()
+    game.headers["Termination"] = record.termination
+
+    if record.fen != chess.STARTING_FEN:
+        game.setup(record.fen)
+
+    # Add opening and engine moves, the latter with their comments
+    node = game
+    for move in record.openingMoves:
+        node = node.add_variation(chess.Move.from_uci(move))
+    for i, move in enumerate(record.moves):
+        node = node.add_variation(chess.Move.from_uci(move))
+        if record.comments != None:
+            node.comment = record.comments[i]
+
+    # Add exact reason for the end of the game
+    if node.comment:
+        node.comment += ", " + record.reason
+    else:
+        node.comment = record.reason
+
+    return game
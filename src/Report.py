@@ -0,0 +1,62 @@
+import numpy as np
+from src.ResultStore import ResultStore, defaultStorePath
+from src.Stats import matchSummaries, runCounts, formatStat
+from src.Archive import ArchiveReader
+
+# Function for summarizing all matches in the result store at once, optionally only those whose key contains a string
+def report(matchFilter: str = None, outputName: str = None):
+    store = ResultStore(defaultStorePath())
+    runs = store.runs()
+    rows = store.gameResults()
+    store.close()
+
+    # Count the games of all runs in one go, runs are ordered by id
+    runIds = np.array([run[0] for run in runs], dtype=np.int64)
+    if rows:
+        gameRunIds, gameNrs, whiteEngines, results = [np.array(column) for column in zip(*rows)]
+    else:
+        gameRunIds = gameNrs = whiteEngines = results = np.array([], dtype=np.int64)
+    trinomial, pentanomial = runCounts(np.searchsorted(runIds, gameRunIds), gameNrs, whiteEngines, results, len(runs))
+    summary = matchSummaries(trinomial, pentanomial)
+
+    # Save output string
+    outputString = f"{'Run':>5} {'Games':>6} {'Score':>15} {'Elo':>8} {'95% CI':>19} {'nElo':>8} {'Draws':>7}  Match\n"
+    for i, (runId, key, games, created) in enumerate(runs):
+        if summary["games"][i] == 0 or (matchFilter and matchFilter not in key):
+            continue
+
+        score = " - ".join(str(count) for count in trinomial[i])
+        interval = "n/a" if np.isnan(summary["eloLower"][i]) else f"{summary['eloLower'][i]:+.1f} to {summary['eloUpper'][i]:+.1f}"
+        outputString += f"{runId:>5} {int(summary['games'][i]):>6} {score:>15} {summary['elo'][i]:>+8.1f} {interval:>19} {formatStat(summary['normalizedElo'][i], '+.1f'):>8} {summary['drawRatio'][i] * 100:>6.1f}%  {key}\n"
+    print(outputString, end="")
+
+    # Write output if needed
+    if outputName:
+        with open("output/" + outputName, "w") as file:
+            file.write(outputString)
+
+# Function for re-scoring all matches of a game archive from its header records, optionally listing the time losses of an engine
+def archiveReport(path: str, timeLossEngine: str = None, outputName: str = None):
+    archive = ArchiveReader(path)
+    matches, trinomial, pentanomial = archive.matchCounts()
+    summary = matchSummaries(trinomial, pentanomial)
+
+    # Save output string
+    outputString = f"{'Games':>6} {'Score':>15} {'Elo':>8} {'95% CI':>19} {'nElo':>8} {'Draws':>7}  Match\n"
+    for i, (engine1, engine2, timeControl) in enumerate(matches):
+        score = " - ".join(str(count) for count in trinomial[i])
+        interval = "n/a" if np.isnan(summary["eloLower"][i]) else f"{summary['eloLower'][i]:+.1f} to {summary['eloUpper'][i]:+.1f}"
+        outputString += f"{int(summary['games'][i]):>6} {score:>15} {summary['elo'][i]:>+8.1f} {interval:>19} {formatStat(summary['normalizedElo'][i], '+.1f'):>8} {summary['drawRatio'][i] * 100:>6.1f}%  {engine1} vs {engine2}, {timeControl}\n"
+
+    if timeLossEngine:
+        timeLosses = archive.timeLosses(timeLossEngine)
+        outputString += f"\n{timeLossEngine} lost {len(timeLosses)} games on time\n"
+        for index in timeLosses:
+            header = archive.headers[index]
+            outputString += f"Game {index}: {archive.strings[header['engine1']]} vs {archive.strings[header['engine2']]}, game number {header['gameNr']}, {int(header['openingMoveCount']) + int(header['moveCount'])} plies, clock {header['flagTimeLeft'] * 1000:.1f}ms\n"
+    print(outputString, end="")
+
+    # Write output if needed
+    if outputName:
+        with open("output/" + outputName, "w") as file:
+            file.write(outputString)
@@ -0,0 +1,105 @@
+import sys, os, sqlite3, datetime, hashlib
+import chess
+from src.GameRecord import GameRecord
+from src.TimeControl import TimeControl
+from src.Openings import OpeningBook
+from src.Adjudication import Adjudication
+
+# Class for recording finished games in a local SQLite database, so interrupted matches can be resumed
+class ResultStore:
+    path: str
+    connection: sqlite3.Connection
+
+    # Open database, creating its tables if needed
+    def __init__(self, path: str):
+        self.path = path
+
+        # Create share directory, which doesn't exist in fresh checkouts and next to built executables
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # Games of distributed matches are recorded from the threads of their workers, one at a time
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+        # Write-ahead log, so recording a game doesn't wait for the disk
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        self.connection.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, matchKey TEXT NOT NULL, games INTEGER NOT NULL, created TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS games (runId INTEGER NOT NULL, gameNr INTEGER NOT NULL, whiteEngine INTEGER NOT NULL, result TEXT NOT NULL, termination TEXT NOT NULL, reason TEXT NOT NULL, PRIMARY KEY (runId, gameNr))")
+
+        # Games of all runs by the identities of their engines, time control, adjudication and opening, so later matches can reuse them
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cache (id INTEGER PRIMARY KEY, engine1 TEXT NOT NULL, engine2 TEXT NOT NULL, timeControl TEXT NOT NULL, adjudication TEXT NOT NULL, opening TEXT NOT NULL, whiteEngine INTEGER NOT NULL, result TEXT NOT NULL, termination TEXT NOT NULL, reason TEXT NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cacheMatch ON cache (engine1, engine2, timeControl)")
+
+        # Games cached before the adjudication was recorded are never reused, since it's unknown
+        if "adjudication" not in [column[1] for column in self.connection.execute("PRAGMA table_info(cache)")]:
+            self.connection.execute("ALTER TABLE cache ADD COLUMN adjudication TEXT NOT NULL DEFAULT 'unknown'")
+        self.connection.commit()
+
+    # Start a new run of a match, return its id
+    def createRun(self, matchKey: str, games: int) -> int:
+        cursor = self.connection.execute("INSERT INTO runs (matchKey, games, created) VALUES (?, ?, ?)", (matchKey, games, datetime.datetime.now().isoformat()))
+        self.connection.commit()
+        return cursor.lastrowid
+
+    # Get id of the latest run of a match, None if there is none
+    def latestRun(self, matchKey: str) -> int:
+        row = self.connection.execute("SELECT id FROM runs WHERE matchKey = ? ORDER BY id DESC LIMIT 1", (matchKey,)).fetchone()
+        return row[0] if row else None
+
+    # Record a finished game of a run
+    def recordGame(self, runId: int, record: GameRecord) -> None:
+        self.connection.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?)", (runId, record.gameNr, record.whiteEngine, record.result, record.termination, record.reason))
+        self.connection.commit()
+
+    # Get records of all finished games of a run (without moves)
+    def games(self, runId: int) -> list:
+        rows = self.connection.execute("SELECT gameNr, whiteEngine, result, termination, reason FROM games WHERE runId = ? ORDER BY gameNr", (runId,)).fetchall()
+        return [GameRecord(gameNr, whiteEngine, None, [], [], None, result, termination, reason) for gameNr, whiteEngine, result, termination, reason in rows]
+
+    # Add a finished game to the cache of its match
+    def cacheGame(self, cacheKey: tuple, record: GameRecord) -> None:
+        self.connection.execute("INSERT INTO cache (engine1, engine2, timeControl, adjudication, opening, whiteEngine, result, termination, reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            cacheKey + (openingKey(record.fen, record.openingMoves), record.whiteEngine, record.result, record.termination, record.reason))
+        self.connection.commit()
+
+    # Get cached games of a match by (opening key, white engine), oldest first (without moves and game numbers)
+    def cachedGames(self, cacheKey: tuple) -> dict:
+        rows = self.connection.execute("SELECT opening, whiteEngine, result, termination, reason FROM cache WHERE engine1 = ? AND engine2 = ? AND timeControl = ? AND adjudication = ? ORDER BY id", cacheKey).fetchall()
+        cachedGames = {}
+        for opening, whiteEngine, result, termination, reason in rows:
+            cachedGames.setdefault((opening, whiteEngine), []).append(GameRecord(None, whiteEngine, None, [], [], None, result, termination, reason))
+        return cachedGames
+
+    # Get all runs as (id, match key, number of games, creation time), ordered by id
+    def runs(self) -> list:
+        return self.connection.execute("SELECT id, matchKey, games, created FROM runs ORDER BY id").fetchall()
+
+    # Get results of the finished games of all runs as (run id, game number, white engine, result)
+    def gameResults(self) -> list:
+        return self.connection.execute("SELECT runId, gameNr, whiteEngine, result FROM games").fetchall()
+
+    def close(self) -> None:
+        self.connection.close()
+
+# Get path of the result store in the share directory, which is kept when switching branches
+def defaultStorePath() -> str:
+    return os.path.dirname(os.path.abspath(sys.argv[0])) + "/share/results.db"
+
+# Create key of a match, runs with the same key can be resumed from each other
+# The adjudication is only added if there is one, so runs without it keep their keys
+def matchKey(engines: list, timeControl: TimeControl, openingBook: OpeningBook, adjudication: Adjudication = None) -> str:
+    openings = os.path.abspath(openingBook.path) if openingBook else "startpos"
+    key = f"{engines[0].fullName()} vs {engines[1].fullName()}, {timeControl.toString()}, {openings}"
+    if adjudication:
+        key += f", {adjudication.toString()}"
+    return key
+
+# Create cache key of a match from the identities of its engines, so renamed engines are recognized and rebuilt ones aren't
+# Games are only reused with the same adjudication, which changes their results
+def cacheKey(engines: list, timeControl: TimeControl, adjudication: Adjudication = None) -> tuple:
+    return (engines[0].identity(), engines[1].identity(), timeControl.toString(), adjudication.toString() if adjudication else "none")
+
+# Create key of an opening from its content, the start position is used for games without a book
+def openingKey(fen: str, moves: list) -> str:
+    return hashlib.sha256(" ".join([fen or chess.STARTING_FEN] + moves).encode()).hexdigest()
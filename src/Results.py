@@ -1,7 +1,14 @@
+from __future__ import annotations
 import math
-from multiprocessing import Manager, Value, Lock, Queue, Event
+from multiprocessing import RawArray, RawValue, Lock, Pipe
+from multiprocessing.connection import Connection
 from src.Engine import Engine
-from src.TimeControl import TimeControl
+from src.TimeControl import TimeControl, MOVE_GRACE
+from src.SPRT import SPRT
+from src.Adjudication import Adjudication
+from src.GameRecord import GameRecord
+from src.Timing import TimingStats
+from src.Stats import matchSummaries
 
 # Class that contains results of an engine match
 class Results:
@@ -11,15 +18,31 @@ class Results:
     engine2Wins: int
     draws: int
     timeControl: TimeControl
+    sprt: SPRT # Sequential probability ratio test of the match, None if there is none
+    adjudication: Adjudication # Adjudication settings of the match, None if there are none
+    adjudications: int # Number of games that were adjudicated
+    pairCounts: list # Pentanomial counts: game pairs with the same opening in which engine 1 scored 0, 0.5, 1, 1.5 or 2 points
+    pairScores: dict # Score of engine 1 in the first finished game of pairs that are waiting for their second game, by pair number
+    crashes: int # Engine processes that crashed during a game
+    timeouts: int # Engine processes that were killed for not answering within their time and the grace time
+    timingStats: TimingStats # Timings of the games played in this session, None if they weren't collected
 
     # Create results based ong given stats
-    def __init__(self, engine1: Engine, engine2: Engine, engine1Wins: int, engine2Wins: int, draws: int, timeControl: TimeControl):
+    def __init__(self, engine1: Engine, engine2: Engine, engine1Wins: int, engine2Wins: int, draws: int, timeControl: TimeControl, sprt: SPRT = None, adjudication: Adjudication = None, adjudications: int = 0, pairCounts: list = None, crashes: int = 0, timeouts: int = 0):
         self.engine1 = engine1
         self.engine2 = engine2
         self.engine1Wins = engine1Wins
         self.engine2Wins = engine2Wins
         self.draws = draws
         self.timeControl = timeControl
+        self.sprt = sprt
+        self.adjudication = adjudication
+        self.adjudications = adjudications
+        self.pairCounts = list(pairCounts) if pairCounts != None else [0] * 5
+        self.pairScores = {}
+        self.crashes = crashes
+        self.timeouts = timeouts
+        self.timingStats = None
 
     # Get match stats
     def getEngine1Wins(self) -> int:
@@ -31,6 +54,18 @@ class Results:
     def getDraws(self) -> int:
         return self.draws
 
+    def getAdjudications(self) -> int:
+        return self.adjudications
+
+    def getPairCounts(self) -> list:
+        return self.pairCounts
+
+    def getCrashes(self) -> int:
+        return self.crashes
+
+    def getTimeouts(self) -> int:
+        return self.timeouts
+
     # Change match stats
     def addEngine1Wins(self, n) -> None:
         self.engine1Wins += n
@@ -41,6 +76,44 @@ class Results:
     def addDraws(self, n) -> None:
         self.draws += n
 
+    def addAdjudications(self, n) -> None:
+        self.adjudications += n
+
+    def addPairCount(self, index: int) -> None:
+        self.pairCounts[index] += 1
+
+    # Count an engine that crashed or timed out
+    def addEngineFault(self, timedOut: bool) -> None:
+        if timedOut:
+            self.timeouts += 1
+        else:
+            self.crashes += 1
+
+    # Count a finished game in its pair (games 2k and 2k + 1 share an opening), once both games of the pair are finished
+    # Only called by the process that receives all games, since waiting pairs aren't shared
+    def addPairGame(self, record: GameRecord) -> None:
+        winnerEngine = record.winnerEngine()
+        halfPoints = 1 if winnerEngine == None else 2 if winnerEngine == 0 else 0
+
+        pairNr = record.gameNr // 2
+        if pairNr in self.pairScores:
+            self.addPairCount(self.pairScores.pop(pairNr) + halfPoints)
+        else:
+            self.pairScores[pairNr] = halfPoints
+
+    # Change match stats based on a finished game
+    def addRecord(self, record: GameRecord) -> None:
+        winnerEngine = record.winnerEngine()
+        if winnerEngine == None:
+            self.addDraws(1)
+        elif winnerEngine == 0:
+            self.addEngine1Wins(1)
+        else:
+            self.addEngine2Wins(1)
+
+        if record.wasAdjudicated():
+            self.addAdjudications(1)
+
     # More match stats not stored in variables
     def gameAmount(self) -> int:
         return self.getEngine1Wins() + self.getEngine2Wins() + self.getDraws()
@@ -69,6 +142,18 @@ class Results:
         eloDiff = self.eloDifference()
         return ("+" if eloDiff > 0 else "") + str(eloDiff)
 
+    # Calculate elo difference with its 95% confidence interval, normalized elo and draw ratio (using game pairs if there are any)
+    def summary(self) -> dict:
+        summary = matchSummaries([self.getEngine1Wins(), self.getEngine2Wins(), self.getDraws()], self.getPairCounts())
+        return {name: float(values[0]) for name, values in summary.items()}
+
+    # Convert elo difference and its confidence interval to string
+    def eloIntervalString(self) -> str:
+        summary = self.summary()
+        if math.isnan(summary["eloLower"]):
+            return f"{summary['elo']:+.2f} (95% CI: n/a)"
+        return f"{summary['elo']:+.2f} (95% CI: {summary['eloLower']:+.2f} to {summary['eloUpper']:+.2f})"
+
     # Calculate likelihood of superiority: likelihood that engine 1 is superior to engine 2
     def los(self) -> float:
         if self.getEngine1Wins() + self.getEngine2Wins() == 0:
@@ -76,88 +161,162 @@ class Results:
         unroundedLos = 0.5 * (1 + math.erf((self.getEngine1Wins() - self.getEngine2Wins()) / math.sqrt(2 * (self.getEngine1Wins() + self.getEngine2Wins()))))
         return round(unroundedLos * 100, 2)
 
+    # Calculate log-likelihood ratio of the SPRT hypotheses for engine 1
+    def llr(self) -> float:
+        return round(self.sprt.llr(self.getEngine1Wins(), self.getEngine2Wins(), self.getDraws()), 2)
+
+    # Get hypothesis accepted by the SPRT, None if it isn't finished
+    def sprtResult(self) -> int:
+        return self.sprt.result(self.getEngine1Wins(), self.getEngine2Wins(), self.getDraws())
+
     # Create string out of score
     def scoreString(self):
         return f"{self.getEngine1Wins()} - {self.getEngine2Wins()} - {self.getDraws()}"
 
+    # Create string out of SPRT state
+    def sprtString(self):
+        sprtResult = self.sprtResult()
+        if sprtResult == None:
+            resultString = "inconclusive"
+        else:
+            resultString = f"H{sprtResult} accepted"
+
+        return f"LLR {self.llr()} ({round(self.sprt.lowerBound(), 2)}, {round(self.sprt.upperBound(), 2)}) {self.sprt.toString()} - {resultString}"
+
     # Convert stats to multi-line string
     def statString(self):
         message = (f"Engine match: {self.engine1.fullName()} vs {self.engine2.fullName()}:\n"
                    f"Time control: {self.timeControl.toString()}\n"
                    f"Games played: {self.gameAmount()}\n"
                    f"Final score: {self.scoreString()}\n"
-                   f"Elo difference: {self.eloDifferenceString()}\n"
+                   f"Elo difference: {self.eloIntervalString()}\n"
                    f"Likelihood of superiority: {self.los()}%\n")
 
+        summary = self.summary()
+        normalizedElo = "n/a" if math.isnan(summary["normalizedElo"]) else f"{summary['normalizedElo']:+.2f} +- {summary['normalizedEloError']:.2f}"
+        message += (f"Normalized elo: {normalizedElo}\n"
+                    f"Draw ratio: {summary['drawRatio'] * 100:.2f}%\n"
+                    f"Game pairs (0 - 0.5 - 1 - 1.5 - 2): {' - '.join(str(count) for count in self.getPairCounts())}\n")
+
+        if self.getCrashes() or self.getTimeouts():
+            message += f"Engine faults: {self.getCrashes()} crashes, {self.getTimeouts()} timeouts\n"
+
+        if self.adjudication:
+            message += f"Adjudicated games: {self.getAdjudications()} ({self.adjudication.toString()})\n"
+
+        if self.sprt:
+            message += f"SPRT: {self.sprtString()}\n"
+
+        if self.timingStats:
+            message += self.timingStats.statString()
+
         return message
 
-# Class for sharing results between processes using multiprocessing
+# Class for sharing results between processes using shared memory, without a server process
 class SharedResults(Results):
     engine1: Engine
     engine2: Engine
-    engine1Wins: Value
-    engine2Wins: Value
-    draws: Value
+    counts: RawArray # Engine 1 wins, engine 2 wins, draws, adjudicated games, the pentanomial counts, engine crashes and timeouts
     timeControl: TimeControl
-    stop: Event # Event for stopping match prematurely
+    sprt: SPRT
+    adjudication: Adjudication
+    recordMoveInfo: bool # Whether game records contain the score, depth and time of every move
+    moveGrace: float # Seconds an engine gets beyond its time for a move before it's killed
+    retries: int # Number of times a game is replayed after an engine crashed or timed out
+    stop: RawValue # Flag for stopping match prematurely, only written by the main process
     lock: Lock # Lock for incrementing wins/draws
-    eventQueue: Queue # Queue for events from child processes to main process
+    eventReader: Connection # Pipe end that the main process receives events from
+    eventWriter: Connection # Pipe end that child processes send events to
+    eventLock: Lock # Lock for sending events, so messages of different processes don't mix
 
-    # Create shared results using stats and multiprocessing manager
-    def __init__(self, engine1: Engine, engine2: Engine, engine1Wins: int, engine2Wins: int, draws: int, timeControl: TimeControl, manager: Manager):
+    # Create shared results using stats, has to be passed to child processes on their creation
+    def __init__(self, engine1: Engine, engine2: Engine, engine1Wins: int, engine2Wins: int, draws: int, timeControl: TimeControl, sprt: SPRT = None, adjudication: Adjudication = None, adjudications: int = 0, recordMoveInfo: bool = False, pairCounts: list = None, moveGrace: float = MOVE_GRACE, retries: int = 0):
         self.engine1 = engine1
         self.engine2 = engine2
-        self.engine1Wins = manager.Value("i", engine1Wins)
-        self.engine2Wins = manager.Value("i", engine2Wins)
-        self.draws = manager.Value("i", draws)
+        self.counts = RawArray("i", [engine1Wins, engine2Wins, draws, adjudications] + (list(pairCounts) if pairCounts != None else [0] * 5) + [0, 0])
+        self.pairScores = {}
         self.timeControl = timeControl
-        self.stop = manager.Event()
-        self.lock = manager.Lock()
-        self.eventQueue = manager.Queue()
+        self.sprt = sprt
+        self.adjudication = adjudication
+        self.recordMoveInfo = recordMoveInfo
+        self.moveGrace = moveGrace
+        self.retries = retries
+        self.stop = RawValue("b", False)
+        self.lock = Lock()
+        self.eventReader, self.eventWriter = Pipe(duplex=False)
+        self.eventLock = Lock()
 
     # Get match stats
     def getEngine1Wins(self) -> int:
-        return self.engine1Wins.value
+        return self.counts[0]
 
     def getEngine2Wins(self) -> int:
-        return self.engine2Wins.value
+        return self.counts[1]
 
     def getDraws(self) -> int:
-        return self.draws.value
+        return self.counts[2]
+
+    def getAdjudications(self) -> int:
+        return self.counts[3]
 
-    # Change match stats (with lock since increments of multiprocessing.Value are not atomic)
+    def getPairCounts(self) -> list:
+        return self.counts[4:9]
+
+    def getCrashes(self) -> int:
+        return self.counts[9]
+
+    def getTimeouts(self) -> int:
+        return self.counts[10]
+
+    # Change match stats (with lock since increments of shared memory are not atomic)
     def addEngine1Wins(self, n) -> None:
         with self.lock:
-            self.engine1Wins.value += n
+            self.counts[0] += n
 
     def addEngine2Wins(self, n) -> None:
         with self.lock:
-            self.engine2Wins.value += n
+            self.counts[1] += n
 
     def addDraws(self, n) -> None:
         with self.lock:
-            self.draws.value += n
+            self.counts[2] += n
+
+    def addAdjudications(self, n) -> None:
+        with self.lock:
+            self.counts[3] += n
+
+    def addPairCount(self, index: int) -> None:
+        with self.lock:
+            self.counts[4 + index] += 1
+
+    def addEngineFault(self, timedOut: bool) -> None:
+        with self.lock:
+            self.counts[10 if timedOut else 9] += 1
 
     # Stopping matches
     def stopMatch(self) -> None:
-        self.stop.set()
+        self.stop.value = True
 
     def wasStopped(self) -> bool:
-        return self.stop.is_set()
+        return bool(self.stop.value)
 
     # Managing events
     def putEvent(self, event: Event) -> None:
-        self.eventQueue.put(event)
+        with self.eventLock:
+            self.eventWriter.send(event)
 
     def hasEvent(self) -> bool:
-        return not self.eventQueue.empty()
+        return self.eventReader.poll()
 
-    def getEvent(self) -> Event:
-        return self.eventQueue.get()
+    # Wait for the next event, return None if there is none before the timeout
+    def getEvent(self, timeout: float = None) -> Event:
+        if self.eventReader.poll(timeout):
+            return self.eventReader.recv()
+        return None
 
     # Converting to pure results object
     def toResults(self) -> Results:
-        return Results(self.engine1, self.engine2, self.getEngine1Wins(), self.getEngine2Wins(), self.getDraws(), self.timeControl)
+        return Results(self.engine1, self.engine2, self.getEngine1Wins(), self.getEngine2Wins(), self.getDraws(), self.timeControl, self.sprt, self.adjudication, self.getAdjudications(), self.getPairCounts(), self.getCrashes(), self.getTimeouts())
 
 # General class for events
 class Event:
@@ -165,6 +324,27 @@ class Event:
 
 # Event for completed match
 class MatchEvent(Event):
+    record: GameRecord
+
+    def __init__(self, record: GameRecord):
+        self.record = record
+
+# Event for a game that started on a worker
+class StartedEvent(Event):
+    worker: str # Worker process or slot playing the game
+
+    def __init__(self, worker: str):
+        self.worker = worker
+
+# Event for an engine process that crashed or timed out, it's restarted for the next game of the worker
+class RestartEvent(Event):
+    worker: str
+
+    def __init__(self, worker: str):
+        self.worker = worker
+
+# Event for all games of a match being finished, sent by the main process itself
+class FinishedEvent(Event):
     pass
 
 # Event for error encountered
@@ -0,0 +1,55 @@
+import math
+
+# Class for a sequential probability ratio test, deciding between two elo hypotheses as early as possible
+class SPRT:
+    elo0: float
+    elo1: float
+    alpha: float
+    beta: float
+
+    # Extract test parameters from string: ("0,5,0.05,0.05" -> elo0: 0, elo1: 5, alpha: 0.05, beta: 0.05)
+    def __init__(self, sprtString: str):
+        params = [float(param) for param in sprtString.split(",")]
+        if len(params) != 4:
+            raise ValueError(f"Invalid SPRT parameters '{sprtString}', expected elo0,elo1,alpha,beta")
+        self.elo0, self.elo1, self.alpha, self.beta = params
+
+    # Log-likelihood ratio below which elo0 is accepted
+    def lowerBound(self) -> float:
+        return math.log(self.beta / (1 - self.alpha))
+
+    # Log-likelihood ratio above which elo1 is accepted
+    def upperBound(self) -> float:
+        return math.log((1 - self.beta) / self.alpha)
+
+    # Calculate log-likelihood ratio of the hypotheses for the wins, losses and draws of engine 1 (normal approximation)
+    def llr(self, wins: int, losses: int, draws: int) -> float:
+        games = wins + losses + draws
+        if games == 0:
+            return 0.0
+
+        # Mean and variance of the score per game
+        score = (wins + draws / 2) / games
+        variance = (wins + draws / 4) / games - score ** 2
+        if variance <= 0:
+            return 0.0
+
+        # Expected scores of the hypotheses
+        score0 = 1 / (1 + 10 ** (-self.elo0 / 400))
+        score1 = 1 / (1 + 10 ** (-self.elo1 / 400))
+
+        return (score1 - score0) * (2 * score - score0 - score1) / (2 * variance / games)
+
+    # Get accepted hypothesis (0 or 1), None if the test isn't finished
+    def result(self, wins: int, losses: int, draws: int) -> int:
+        llr = self.llr(wins, losses, draws)
+        if llr <= self.lowerBound():
+            return 0
+        elif llr >= self.upperBound():
+            return 1
+        else:
+            return None
+
+    # Convert test parameters back to string
+    def toString(self) -> str:
+        return f"[{self.elo0}, {self.elo1}], alpha {self.alpha}, beta {self.beta}"
@@ -0,0 +1,94 @@
+import random
+
+# Class for an engine parameter that is tuned with SPSA
+class SPSAParameter:
+    name: str
+    value: float
+    minimum: float
+    maximum: float
+    cEnd: float # Perturbation of the value in the last iteration
+    rEnd: float # Learning rate in the last iteration, relative to the perturbation
+
+    # Create parameter starting at a value
+    def __init__(self, name: str, value: float, minimum: float, maximum: float, cEnd: float, rEnd: float):
+        self.name = name
+        self.value = value
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cEnd = cEnd
+        self.rEnd = rEnd
+
+    # Create parameter from its options, like {"name": "pawn", "start": 100, "min": 50, "max": 150, "c_end": 10, "r_end": 0.002}
+    @classmethod
+    def fromOptions(cls, options: dict):
+        return cls(options["name"], float(options["start"]), float(options["min"]), float(options["max"]), float(options["c_end"]), float(options["r_end"]))
+
+    # Keep a value within the bounds of the parameter
+    def clip(self, value: float) -> float:
+        return min(max(value, self.minimum), self.maximum)
+
+# Class for the state of an SPSA tuning run, every iteration plays an engine with increased values against one with decreased values
+# Gains follow the usual schedule: c_k = c / (k + 1)^gamma, a_k = a / (A + k + 1)^alpha, chosen so c_k and a_k / c_k^2 reach c_end and r_end
+class SPSA:
+    parameters: list
+    iterations: int # Number of iterations of the run
+    alpha: float
+    gamma: float
+    stability: float # Stability constant A, delays the decrease of the learning rate
+    iteration: int # Number of finished iterations
+
+    # Create run with the parameters at their start values
+    def __init__(self, parameters: list, iterations: int, alpha: float = 0.602, gamma: float = 0.101):
+        self.parameters = parameters
+        self.iterations = iterations
+        self.alpha = alpha
+        self.gamma = gamma
+        self.stability = 0.1 * iterations
+        self.iteration = 0
+
+    # Get perturbation of a parameter in an iteration
+    def perturbation(self, parameter: SPSAParameter, k: int) -> float:
+        return parameter.cEnd * self.iterations ** self.gamma / (k + 1) ** self.gamma
+
+    # Get learning rate of a parameter in an iteration
+    def learningRate(self, parameter: SPSAParameter, k: int) -> float:
+        aEnd = parameter.rEnd * parameter.cEnd ** 2
+        return aEnd * (self.stability + self.iterations) ** self.alpha / (self.stability + k + 1) ** self.alpha
+
+    # Get current values of all parameters
+    def values(self) -> list:
+        return [parameter.value for parameter in self.parameters]
+
+    # Choose random perturbation directions and the values of the increased and decreased engine for an iteration
+    def perturb(self, k: int) -> tuple:
+        directions = [random.choice([-1, 1]) for _ in self.parameters]
+        plusValues = [parameter.clip(parameter.value + self.perturbation(parameter, k) * direction) for parameter, direction in zip(self.parameters, directions)]
+        minusValues = [parameter.clip(parameter.value - self.perturbation(parameter, k) * direction) for parameter, direction in zip(self.parameters, directions)]
+        return directions, plusValues, minusValues
+
+    # Move the parameters in the direction of the engine that scored better in an iteration
+    # Iterations are finished as results arrive, so the values may have changed since the iteration was perturbed
+    def update(self, k: int, directions: list, score: float) -> None:
+        for parameter, direction in zip(self.parameters, directions):
+            step = self.learningRate(parameter, k) / self.perturbation(parameter, k) * score * direction
+            parameter.value = parameter.clip(parameter.value + step)
+        self.iteration += 1
+
+    # Check if all iterations are finished
+    def isFinished(self) -> bool:
+        return self.iteration >= self.iterations
+
+    # Create checkpoint of the run
+    def toDict(self) -> dict:
+        return {"iteration": self.iteration, "values": {parameter.name: parameter.value for parameter in self.parameters}}
+
+    # Continue run from a checkpoint, parameters that aren't in it keep their start value
+    def loadDict(self, checkpoint: dict) -> None:
+        self.iteration = checkpoint["iteration"]
+        for parameter in self.parameters:
+            if parameter.name in checkpoint["values"]:
+                parameter.value = checkpoint["values"][parameter.name]
+
+    # Create string of the current values
+    def valueString(self) -> str:
+        return ", ".join(f"{parameter.name}={parameter.value:.4g}" for parameter in self.parameters)
@@ -0,0 +1,98 @@
+import math
+import numpy as np
+
+# Average score per game of engine 1 in a game pair, by pentanomial index (0, 0.5, 1, 1.5 or 2 points in the pair)
+PAIR_SCORES = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+
+# Quantile of the normal distribution for 95% confidence intervals
+Z_95 = 1.959963984540054
+
+# Convert expected scores to elo differences, limited to +-10000 for scores of 0 and 1
+def scoreToElo(score: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.clip(400 * np.log10(score / (1 - score)), -10000, 10000)
+
+# Calculate stats of many matches at once from their trinomial counts (engine 1 wins, engine 2 wins, draws; shape (n, 3))
+# and pentanomial counts (game pairs in which engine 1 scored 0, 0.5, 1, 1.5 or 2 points; shape (n, 5))
+# The score and its variance are estimated from the complete game pairs if there are any, so the correlation of games with the same opening is included
+# Without pairs, or if all pairs scored the same but the games didn't, they are estimated from all games
+def matchSummaries(trinomial: np.ndarray, pentanomial: np.ndarray) -> dict:
+    trinomial = np.asarray(trinomial, dtype=float).reshape(-1, 3)
+    pentanomial = np.asarray(pentanomial, dtype=float).reshape(-1, 5)
+    wins, losses, draws = trinomial.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        games = wins + losses + draws
+        pairs = pentanomial.sum(axis=1)
+
+        # Score and variance of a single game's score from games, and of a pair's average score from pairs
+        gameScore = (wins + draws / 2) / games
+        gameVariance = (wins + draws / 4) / games - gameScore ** 2
+        pairMean = (pentanomial * PAIR_SCORES).sum(axis=1) / pairs
+        pairVariance = (pentanomial * PAIR_SCORES ** 2).sum(axis=1) / pairs - pairMean ** 2
+
+        # Variance of a single game's score and of the mean score, from pairs (counted as two games) or from games
+        usePairs = (pairs > 0) & ~((pairVariance <= 0) & (gameVariance > 0))
+        score = np.where(usePairs, pairMean, gameScore)
+        perGameVariance = np.where(usePairs, 2 * pairVariance, gameVariance)
+        meanVariance = np.where(usePairs, pairVariance / pairs, gameVariance / games)
+
+        # 95% confidence interval of the score, converted to elo
+        # Without variance (e.g. only draws) there is no interval and no normalized elo, so they are NaN
+        hasVariance = perGameVariance > 0
+        halfWidth = Z_95 * np.sqrt(meanVariance)
+        elo = scoreToElo(score)
+        eloLower = np.where(hasVariance, scoreToElo(np.clip(score - halfWidth, 0, 1)), np.nan)
+        eloUpper = np.where(hasVariance, scoreToElo(np.clip(score + halfWidth, 0, 1)), np.nan)
+
+        # Normalized elo: score difference in standard deviations of a game, independent of the draw ratio
+        normalizedElo = np.where(hasVariance, (score - 0.5) / np.sqrt(perGameVariance) * 800 / math.log(10), np.nan)
+        normalizedEloError = np.where(hasVariance, halfWidth / np.sqrt(perGameVariance) * 800 / math.log(10), np.nan)
+
+        drawRatio = draws / games
+
+    return {
+        "games": games,
+        "pairs": pairs,
+        "score": score,
+        "elo": elo,
+        "eloLower": eloLower,
+        "eloUpper": eloUpper,
+        "normalizedElo": normalizedElo,
+        "normalizedEloError": normalizedEloError,
+        "drawRatio": drawRatio
+    }
+
+# Format a stat for output, NaN values (e.g. the interval without variance) become "n/a"
+def formatStat(value: float, spec: str) -> str:
+    return "n/a" if math.isnan(value) else format(value, spec)
+
+# Count results of stored games by run, with pairs of games (2k, 2k + 1) that share an opening
+# Games are given as arrays of run index, game number, white engine and result ("1-0", "0-1" or "1/2-1/2")
+def runCounts(runIndices: np.ndarray, gameNrs: np.ndarray, whiteEngines: np.ndarray, results: np.ndarray, runAmount: int) -> tuple:
+    runIndices = np.asarray(runIndices, dtype=np.int64)
+    gameNrs = np.asarray(gameNrs, dtype=np.int64)
+    whiteEngines = np.asarray(whiteEngines, dtype=np.int64)
+    results = np.asarray(results)
+
+    # Winner of every game: engine 0, engine 1 or none
+    whiteWins = results == "1-0"
+    blackWins = results == "0-1"
+    engine1Wins = (whiteWins & (whiteEngines == 0)) | (blackWins & (whiteEngines == 1))
+    engine2Wins = (whiteWins & (whiteEngines == 1)) | (blackWins & (whiteEngines == 0))
+    draws = ~(engine1Wins | engine2Wins)
+
+    trinomial = np.zeros((runAmount, 3), dtype=np.int64)
+    for column, mask in enumerate([engine1Wins, engine2Wins, draws]):
+        trinomial[:, column] = np.bincount(runIndices[mask], minlength=runAmount)
+
+    # Sum half points of engine 1 over the games of every pair, only complete pairs are counted
+    pentanomial = np.zeros((runAmount, 5), dtype=np.int64)
+    if len(gameNrs):
+        halfPoints = 2 * engine1Wins + draws
+        pairs, pairIndices, pairSizes = np.unique(np.stack([runIndices, gameNrs // 2], axis=1), axis=0, return_inverse=True, return_counts=True)
+        pairHalfPoints = np.bincount(pairIndices.ravel(), weights=halfPoints, minlength=len(pairs)).astype(np.int64)
+        complete = pairSizes == 2
+        np.add.at(pentanomial, (pairs[complete, 0], pairHalfPoints[complete]), 1)
+
+    return trinomial, pentanomial
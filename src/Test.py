@@ -1,27 +1,94 @@
+from contextlib import ExitStack
 import src.EngineMatch
+import src.Distributed
 from src.Engine import Engine
-from src.TimeControl import TimeControl
+from src.TimeControl import TimeControl, MOVE_GRACE
+from src.SPRT import SPRT
+from src.Openings import OpeningBook
+from src.Adjudication import Adjudication
+from src.PGN import PGNWriter
+from src.Archive import ArchiveWriter
+from src.ResultStore import ResultStore, defaultStorePath
+from src.Timing import TimingLog
+from src.MatchSettings import MatchSettings
 
-# Function for testing multiple engines against one base engine
-def test(testEngineNames: list, baseEngineName: str, games: int, timeControl: str, processes: int, outputName: str):
+# Function for testing multiple engines against one base engine (or each other)
+def test(testEngineNames: list, baseEngineName: str, games: int, timeControl: str, processes: int = 1, outputName: str = None, sprt: str = None, openings: str = None, backend: str = "process", resign: str = None, draw: str = None, tablebases: str = None, pgn: str = None, pgnComments: bool = False, resume: bool = False, roundRobin: bool = False, timingLog: str = None, threads: int = None, hash: int = None, affinity: bool = False, serveAddress: tuple = None, batchSize: int = None, archive: str = None, topUp: bool = False, metricsPort: int = None, moveGrace: float = MOVE_GRACE, retries: int = 0):
     # Parse time control string
     timeControl = TimeControl(timeControl)
 
-    # Save output string
-    outputString = ""
+    # Parse SPRT parameters, the number of games is the maximum then
+    if sprt:
+        sprt = SPRT(sprt)
 
-    # Test every engine against the base engine separately
-    baseEngine = Engine.fromName(baseEngineName)
-    for testEngineName in testEngineNames:
-        # Complete engine match
-        testEngine = Engine.fromName(testEngineName)
-        results = src.EngineMatch.engineMatch([testEngine, baseEngine], games, timeControl, processes)
+    # Parse adjudication settings
+    adjudication = Adjudication(resign, draw, tablebases)
+    if not adjudication.isEnabled():
+        adjudication = None
+
+    # Close every opened file even if the matches fail, so compressed PGNs are finalized
+    with ExitStack() as stack:
+        # Open opening book, every match starts at its first opening
+        openingBook = OpeningBook(openings) if openings else None
+        if openingBook:
+            stack.callback(openingBook.close)
+
+        # Open PGN file that the games of all matches are written to
+        pgnWriter = PGNWriter(pgn) if pgn else None
+        if pgnWriter:
+            stack.callback(pgnWriter.close)
+
+        # Open compact archive that the games of all matches are appended to
+        archiveWriter = ArchiveWriter(archive) if archive else None
+        if archiveWriter:
+            stack.callback(archiveWriter.close)
+
+        # Open JSON lines file that timings are exported to
+        timingLog = TimingLog(timingLog) if timingLog else None
+        if timingLog:
+            stack.callback(timingLog.close)
+
+        # Open store that finished games are recorded in
+        store = ResultStore(defaultStorePath())
+        stack.callback(store.close)
+
+        # Save output string
+        outputString = ""
+
+        # Collect UCI options that all engines are started with
+        engineOptions = {}
+        if threads != None:
+            engineOptions["Threads"] = threads
+        if hash != None:
+            engineOptions["Hash"] = hash
+
+        # Serve live metrics on the local machine only
+        metricsAddress = ("127.0.0.1", metricsPort) if metricsPort != None else None
+
+        # Pair every engine with the base engine, or every engine with every other one in a round robin
+        baseEngine = Engine.fromName(baseEngineName, engineOptions)
+        testEngines = [Engine.fromName(testEngineName, engineOptions) for testEngineName in testEngineNames]
+        if roundRobin:
+            allEngines = testEngines + [baseEngine]
+            pairings = [[allEngines[i], allEngines[j]] for i in range(len(allEngines)) for j in range(i + 1, len(allEngines))]
+        else:
+            pairings = [[testEngine, baseEngine] for testEngine in testEngines]
+
+        # Collect the settings that all matches are played with
+        settings = MatchSettings(games, timeControl, processes=processes, sprt=sprt, openingBook=openingBook, backend=backend, adjudication=adjudication, pgnWriter=pgnWriter, recordMoveInfo=pgnComments, store=store, resume=resume, timingLog=timingLog, affinity=affinity, archiveWriter=archiveWriter, topUp=topUp, metricsAddress=metricsAddress, moveGrace=moveGrace, retries=retries, batchSize=batchSize)
+
+        # Complete all engine matches on the same processes, or on workers connecting over TCP
+        if serveAddress:
+            resultsList = src.Distributed.serveMatches(pairings, settings, serveAddress)
+        else:
+            resultsList = src.EngineMatch.engineMatches(pairings, settings)
 
         # Print out match stats
-        statString = results.statString()
-        print(statString)
-        outputString += statString + "\n"
-        
+        for results in resultsList:
+            statString = results.statString()
+            print(statString)
+            outputString += statString + "\n"
+
     # Write output if needed
     if outputName:
         with open("output/" + outputName, "w") as file:
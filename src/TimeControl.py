@@ -1,79 +1,140 @@
-import time
+from __future__ import annotations
+import time, copy
 import chess, chess.engine
 
+# Seconds an engine gets beyond its time for a move before it's considered hung and killed
+MOVE_GRACE = 10.0
+
+# Seconds a move that is only limited by nodes or depth may take before the grace time starts
+UNTIMED_MOVE_TIME = 60.0
+
 # Class for holding time control information
 class TimeControl:
-    baseTime: float
+    baseTime: float # None if there is no clock
     increment: float
-    exactTime: float
+    exactTime: float # Time per move, None if there is none
+    nodes: int # Nodes per move, None if there is no node limit
+    depth: int # Depth per move, None if there is no depth limit
+    odds: float # Factor of the time and nodes of engine 1 relative to engine 2
 
-    # Extract time control information from string: ("3+0.1" -> baseTime 3, increment: 0.1; "=5": exactTime 5)
+    # Extract time control information from string, with limits separated by commas:
+    # "3+0.1" -> baseTime 3, increment: 0.1; "=5": exactTime 5; "nodes=50000"; "depth=12"; "=0.1,nodes=50000" -> whichever is reached first
+    # "odds=2" gives engine 1 twice the time and nodes of engine 2, like "10+0.1,odds=2"
     def __init__(self, tcString: str):
-        if tcString[0] == "=":
-            # Extract exact time per move
-            self.exactTime = float(tcString[1:])
-            self.baseTime = None
-            self.increment = None
-        else:
-            self.exactTime = None
-            if "+" in tcString:
+        self.baseTime = self.increment = self.exactTime = self.nodes = self.depth = None
+        self.odds = 1.0
+
+        for part in tcString.split(","):
+            if part.startswith("nodes="):
+                self.nodes = int(part[6:])
+            elif part.startswith("depth="):
+                self.depth = int(part[6:])
+            elif part.startswith("odds="):
+                self.odds = float(part[5:])
+            elif part[0] == "=":
+                # Extract exact time per move
+                self.exactTime = float(part[1:])
+            elif "+" in part:
                 # Extract time with increment
-                self.baseTime = float(tcString[:tcString.index("+")])
-                self.increment = float(tcString[tcString.index("+") + 1:])
+                self.baseTime = float(part[:part.index("+")])
+                self.increment = float(part[part.index("+") + 1:])
             else:
                 # Extract time without increment
-                self.baseTime = float(tcString)
+                self.baseTime = float(part)
                 self.increment = 0
 
+        if self.baseTime != None and self.exactTime != None:
+            raise ValueError(f"Invalid time control '{tcString}', a clock can't be combined with a time per move")
+        if self.baseTime == None and self.exactTime == None and self.nodes == None and self.depth == None:
+            raise ValueError(f"Invalid time control '{tcString}', no limit given")
+
+    # Check if engines play on a clock that they can lose on
+    def hasClock(self) -> bool:
+        return self.baseTime != None
+
+    # Get time control of an engine (0 or 1), with the time and nodes scaled by its odds
+    def forEngine(self, engineNr: int) -> TimeControl:
+        factor = self.odds if engineNr == 0 else 1.0
+        engineControl = copy.copy(self)
+        engineControl.odds = 1.0
+        if self.baseTime != None:
+            engineControl.baseTime = self.baseTime * factor
+            engineControl.increment = self.increment * factor
+        if self.exactTime != None:
+            engineControl.exactTime = self.exactTime * factor
+        if self.nodes != None:
+            engineControl.nodes = max(1, round(self.nodes * factor))
+        return engineControl
+
     # Convert time control back to string
     def toString(self) -> str:
-        if self.exactTime == None:
-            return str(self.baseTime) + "+" + str(self.increment)
-        else:
-            return "=" + str(self.exactTime)
+        parts = []
+        if self.baseTime != None:
+            parts.append(str(self.baseTime) + "+" + str(self.increment))
+        if self.exactTime != None:
+            parts.append("=" + str(self.exactTime))
+        if self.nodes != None:
+            parts.append(f"nodes={self.nodes}")
+        if self.depth != None:
+            parts.append(f"depth={self.depth}")
+        if self.odds != 1.0:
+            parts.append(f"odds={self.odds}")
+        return ",".join(parts)
 
 # Class for managing time in a match
 class MatchTime:
-    timeControl: TimeControl
+    whiteControl: TimeControl # Time control of the engine playing white, with its odds
+    blackControl: TimeControl
     whiteTime: float
     blackTime: float
     startTime: float
     
-    # Set up start of match
-    def __init__(self, timeControl: TimeControl) -> None:
-        self.timeControl = timeControl
-        self.whiteTime = timeControl.baseTime
-        self.blackTime = timeControl.baseTime
-
-    # Return search stop condition
-    def matchLimit(self) -> chess.engine.Limit:
-        if self.timeControl.exactTime == None:
-            # Handle sudden death time limit
-            return chess.engine.Limit(white_clock=self.whiteTime, black_clock=self.blackTime, white_inc=self.timeControl.increment, black_inc=self.timeControl.increment)
-        else:
-            # Handle fixed time limit
-            return chess.engine.Limit(time=self.timeControl.exactTime)
-
-    # Start clock
+    # Set up start of match, the engine playing white (0 or 1) decides which color gets the odds
+    def __init__(self, timeControl: TimeControl, whiteEngine: int = 0) -> None:
+        self.whiteControl = timeControl.forEngine(whiteEngine)
+        self.blackControl = timeControl.forEngine(1 - whiteEngine)
+        self.whiteTime = self.whiteControl.baseTime
+        self.blackTime = self.blackControl.baseTime
+
+    # Return search stop condition of the color to move, only the first limit that is reached counts
+    def matchLimit(self, turn: chess.Color = chess.WHITE) -> chess.engine.Limit:
+        control = self.whiteControl if turn == chess.WHITE else self.blackControl
+        limit = chess.engine.Limit(time=control.exactTime, nodes=control.nodes, depth=control.depth)
+
+        # Handle sudden death time limit
+        if control.hasClock():
+            limit.white_clock = self.whiteTime
+            limit.black_clock = self.blackTime
+            limit.white_inc = self.whiteControl.increment
+            limit.black_inc = self.blackControl.increment
+
+        return limit
+
+    # Start clock (monotonic, so it isn't affected by changes of the system time)
     def start(self) -> None:
-        self.startTime = time.time()
+        self.startTime = time.perf_counter()
 
-    # Stop clock, deduct used time
-    def stop(self, turn: chess.Color) -> None:
-        timePassed = time.time() - self.startTime
+    # Stop clock, deduct used time and return it
+    def stop(self, turn: chess.Color) -> float:
+        timePassed = time.perf_counter() - self.startTime
         self.startTime = None
 
         # Deduct time used
-        if self.timeControl.exactTime == None:
+        if self.whiteControl.hasClock():
             if turn == chess.WHITE:
                 self.whiteTime -= timePassed
-                self.whiteTime += self.timeControl.increment
+                self.whiteTime += self.whiteControl.increment
             else:
                 self.blackTime -= timePassed
-                self.blackTime += self.timeControl.increment
+                self.blackTime += self.blackControl.increment
+
+        return timePassed
 
     # Check if engine that moved flagged
     def flagged(self):
-        if self.timeControl.exactTime == None:
+        if self.whiteControl.hasClock():
             return self.whiteTime < 0 or self.blackTime < 0
 
+    # Get time left on the clock of a color
+    def timeLeft(self, turn: chess.Color) -> float:
+        return self.whiteTime if turn == chess.WHITE else self.blackTime
@@ -0,0 +1,134 @@
+import math, json
+
+# Class for timings of a single game, measured with a monotonic clock in the process playing the game
+class GameTiming:
+    thinkTimes: list # Time of every engine move, from sending the position to receiving the move
+    overheadTimes: list # Time of the harness between engine moves (playing the move, game end and stop checks)
+    flagTimeLeft: float # Clock of the engine that lost on time after its last move, None if no engine flagged
+    duration: float # Time of the whole game
+
+    def __init__(self):
+        self.thinkTimes = []
+        self.overheadTimes = []
+        self.flagTimeLeft = None
+        self.duration = None
+
+    # Convert to dictionary for sending over the network
+    def toDict(self) -> dict:
+        return {"thinkTimes": self.thinkTimes, "overheadTimes": self.overheadTimes, "flagTimeLeft": self.flagTimeLeft, "duration": self.duration}
+
+    # Create timings from a dictionary
+    @classmethod
+    def fromDict(cls, data: dict):
+        timing = cls()
+        timing.thinkTimes = data["thinkTimes"]
+        timing.overheadTimes = data["overheadTimes"]
+        timing.flagTimeLeft = data["flagTimeLeft"]
+        timing.duration = data["duration"]
+        return timing
+
+# Class for a histogram of times with logarithmic buckets, so millions of values take constant memory
+class Histogram:
+    counts: dict # Number of values by bucket
+    count: int
+    total: float
+    maximum: float
+
+    # Number of buckets per factor of 10, values are accurate to about 12%
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    # Add a value to its bucket
+    def add(self, value: float) -> None:
+        bucket = math.floor(math.log10(max(value, 1e-9)) * self.BUCKETS_PER_DECADE)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    # Get value below which a percentage of values lie (middle of its bucket)
+    def percentile(self, percentage: float) -> float:
+        if self.count == 0:
+            return float("nan")
+
+        rank = percentage / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(10 ** ((bucket + 0.5) / self.BUCKETS_PER_DECADE), self.maximum)
+        return self.maximum
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else float("nan")
+
+    # Convert to string of percentiles in a unit (given by its factor to seconds)
+    def toString(self, factor: float, unit: str) -> str:
+        values = [("mean", self.mean()), ("p50", self.percentile(50)), ("p90", self.percentile(90)), ("p99", self.percentile(99)), ("max", self.maximum)]
+        return ", ".join(f"{name} {round(value * factor, 2)}{unit}" for name, value in values)
+
+    # Convert to dictionary for JSON export, buckets by their lower bound in seconds
+    def toDict(self) -> dict:
+        return {"count": self.count, "mean": self.mean(), "max": self.maximum, "buckets": {f"{10 ** (bucket / self.BUCKETS_PER_DECADE):.3g}": count for bucket, count in sorted(self.counts.items())}}
+
+# Class for timing statistics of a whole match, collected in the main process
+class TimingStats:
+    thinkTimes: Histogram
+    overheadTimes: Histogram
+    durations: Histogram
+    flagTimesLeft: list
+
+    def __init__(self):
+        self.thinkTimes = Histogram()
+        self.overheadTimes = Histogram()
+        self.durations = Histogram()
+        self.flagTimesLeft = []
+
+    # Add timings of a finished game
+    def addGame(self, timing: GameTiming) -> None:
+        for thinkTime in timing.thinkTimes:
+            self.thinkTimes.add(thinkTime)
+        for overheadTime in timing.overheadTimes:
+            self.overheadTimes.add(overheadTime)
+        self.durations.add(timing.duration)
+        if timing.flagTimeLeft != None:
+            self.flagTimesLeft.append(timing.flagTimeLeft)
+
+    # Convert stats to multi-line string
+    def statString(self) -> str:
+        message = (f"Move time: {self.thinkTimes.toString(1000, 'ms')}\n"
+                   f"Harness overhead per move: {self.overheadTimes.toString(1000, 'ms')}\n"
+                   f"Game duration: {self.durations.toString(1, 's')}\n"
+                   f"Time losses: {len(self.flagTimesLeft)}")
+
+        if self.flagTimesLeft:
+            message += f" (clock after last move: min {round(min(self.flagTimesLeft) * 1000, 2)}ms, max {round(max(self.flagTimesLeft) * 1000, 2)}ms)"
+
+        return message + "\n"
+
+    # Convert to dictionary for JSON export
+    def toDict(self) -> dict:
+        return {"thinkTimes": self.thinkTimes.toDict(), "overheadTimes": self.overheadTimes.toDict(), "durations": self.durations.toDict(), "flagTimesLeft": self.flagTimesLeft}
+
+# Class for exporting timings as JSON lines, one line for every game and one summary line for every match
+class TimingLog:
+    file: object
+
+    def __init__(self, path: str):
+        self.file = open(path, "a")
+
+    # Write timings of a finished game
+    def writeGame(self, match: str, gameNr: int, timing: GameTiming) -> None:
+        self.file.write(json.dumps({"type": "game", "match": match, "gameNr": gameNr, "duration": timing.duration, "thinkTimes": timing.thinkTimes, "overheadTimes": timing.overheadTimes, "flagTimeLeft": timing.flagTimeLeft}) + "\n")
+
+    # Write timing statistics of a finished match
+    def writeMatch(self, match: str, timingStats: TimingStats) -> None:
+        self.file.write(json.dumps({"type": "match", "match": match, **timingStats.toDict()}) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,132 @@
+import os, json, signal, queue
+import yaml
+from yaml.loader import SafeLoader
+from multiprocessing import Pool
+from inspect import FrameInfo
+from tqdm import tqdm
+from src.Engine import Engine
+from src.TimeControl import TimeControl
+from src.Openings import Opening, OpeningBook
+from src.SPSA import SPSA, SPSAParameter
+from src.EnginePool import EnginePool
+from src.EngineMatch import singleGame
+
+# Function for tuning the numeric command line parameters of an engine with SPSA, configured by a yaml file
+def tune(configPath: str, processes: int, checkpointPath: str = None, outputName: str = None):
+    # Parse tuning options from yaml file
+    with open(configPath, "r") as file:
+        config = yaml.load(file, Loader=SafeLoader)
+    engineName = config["engine_name"]
+    timeControl = TimeControl(config["time_control"])
+    spsa = SPSA([SPSAParameter.fromOptions(options) for options in config["parameters"]], int(config["iterations"]))
+
+    # Make sure the engine exists before starting processes
+    Engine(engineName, spsa.values())
+
+    # Open opening book, both games of an iteration start at the same opening
+    openingBook = OpeningBook(config["openings"]) if config.get("openings") else None
+
+    # Continue from the checkpoint of an earlier run
+    checkpointPath = checkpointPath or os.path.splitext(configPath)[0] + ".checkpoint.json"
+    if os.path.exists(checkpointPath):
+        with open(checkpointPath, "r") as file:
+            spsa.loadDict(json.load(file))
+        print(f"Continuing from iteration {spsa.iteration} of {checkpointPath}")
+
+    # Finished iterations are passed on from the pool's result thread
+    finishedIterations = queue.Queue()
+    stopped = False
+
+    # Handle keyboard interrupt in main process by finishing the running iterations only
+    def handleKeyboardInterrupt(sig: int, frame: FrameInfo):
+        nonlocal stopped
+        stopped = True
+
+    progressBar = tqdm(desc=spsa.valueString(), total=spsa.iterations, initial=spsa.iteration, dynamic_ncols=True, unit="iterations")
+
+    with Pool(processes, initializer=initTuneWorker) as pool:
+        # Handle keyboard interrupts
+        signal.signal(signal.SIGINT, handleKeyboardInterrupt)
+
+        nextIteration = spsa.iteration
+        runningIterations = 0
+        while True:
+            # Keep every process busy with an iteration, perturbing the values as they are now
+            while not stopped and runningIterations < processes and nextIteration < spsa.iterations:
+                directions, plusValues, minusValues = spsa.perturb(nextIteration)
+                opening = openingBook.opening(nextIteration) if openingBook else None
+                pool.apply_async(playTuningPair, (engineName, plusValues, minusValues, timeControl, opening),
+                    callback=lambda score, k=nextIteration, directions=directions: finishedIterations.put((k, directions, score, None)),
+                    error_callback=lambda error, k=nextIteration, directions=directions: finishedIterations.put((k, directions, None, error)))
+                nextIteration += 1
+                runningIterations += 1
+
+            if runningIterations == 0:
+                break
+
+            # Wait with a timeout, so keyboard interrupts are handled on every platform
+            try:
+                k, directions, score, error = finishedIterations.get(timeout=1)
+            except queue.Empty:
+                continue
+            runningIterations -= 1
+
+            # Skip iterations whose games failed, the values stay the same then
+            if error != None:
+                progressBar.write(f"Iteration {k} failed: {error!r}")
+                score = 0
+
+            # Update values as soon as an iteration is finished and save them
+            spsa.update(k, directions, score)
+            writeCheckpoint(checkpointPath, spsa)
+
+            progressBar.set_description(spsa.valueString())
+            progressBar.update(1)
+
+        pool.close()
+        pool.join()
+
+    progressBar.close()
+    print()
+
+    if openingBook:
+        openingBook.close()
+
+    # Print out tuned values
+    outputString = f"Tuned values after {spsa.iteration} of {spsa.iterations} iterations:\n"
+    for parameter in spsa.parameters:
+        outputString += f"{parameter.name}: {parameter.value}\n"
+    print(outputString, end="")
+
+    # Write output if needed
+    if outputName:
+        with open("output/" + outputName, "w") as file:
+            file.write(outputString)
+
+# Save progress of a tuning run, replacing the old checkpoint only once the new one is written
+def writeCheckpoint(checkpointPath: str, spsa: SPSA) -> None:
+    with open(checkpointPath + ".tmp", "w") as file:
+        json.dump(spsa.toDict(), file)
+    os.replace(checkpointPath + ".tmp", checkpointPath)
+
+# Set up a newly created child process, keyboard interrupts are handled by the main process
+def initTuneWorker() -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# Play two games with reversed colors between the engine with increased values and the one with decreased values
+# Both games are played on the same engine processes, the values change with every iteration so they aren't kept after it
+# Returns the wins minus the losses of the increased engine
+def playTuningPair(engineName: str, plusValues: list, minusValues: list, timeControl: TimeControl, opening: Opening) -> int:
+    engines = [Engine(engineName, plusValues), Engine(engineName, minusValues)]
+    enginePool = EnginePool()
+    score = 0
+    try:
+        for gameNr in range(2):
+            winnerEngine = singleGame(engines, timeControl, gameNr, opening, enginePool).winnerEngine()
+            if winnerEngine == 0:
+                score += 1
+            elif winnerEngine == 1:
+                score -= 1
+    finally:
+        enginePool.close()
+    return score